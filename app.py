@@ -1,10 +1,21 @@
 import streamlit as st
-from services.ast_parser import parse_functions
+from services.api_manager import is_api_error, key_health
+from services.ast_parser import function_identity, parse_functions, reparse_functions, unchanged_functions
+from services.batch_parser import parse_sources
+from services.cache import get_cache
 from services.coverage import generate_coverage_report
-from services.docstring_generator import generate_docstring
-from services.validator import validate_docstring
+from services.docstring_generator import (
+    TemplateFallbackError,
+    format_docstring_pep257,
+    generate_docstring_stream_with_provider,
+    generate_docstrings_concurrently,
+)
+from services.validator import get_validation_cache, rules_for_style, validate_function
 from services.code_inserter import apply_all_docstrings
 from services.exporter import create_consolidated_file
+from services.job_journal import discard_job, get_job
+from services.prompt_builder import DEFAULT_TOKEN_BUDGET, build_function_excerpt, estimate_tokens
+from services.result_store import file_fingerprint, generation_key, get_result_store
 from utils.file_utils import read_uploaded_file
 
 # PAGE CONFIG & INITIALIZATION
@@ -227,6 +238,8 @@ if 'function_decisions' not in st.session_state:
     st.session_state.function_decisions = {}
 if 'generated_docstrings' not in st.session_state:
     st.session_state.generated_docstrings = {}
+if 'load_failures' not in st.session_state:
+    st.session_state.load_failures = {}
 
 # HEADER & SIDEBAR
 
@@ -271,7 +284,12 @@ with navbar_col2:
     )
 
 with navbar_col3:
-    st.write("")
+    engine_label = st.selectbox(
+        "🧠 Generation Engine",
+        ["AI (LLM)", "Local templates"],
+        help="Local templates build instant, offline docstring skeletons from the code structure"
+    )
+    engine = "local" if engine_label == "Local templates" else "llm"
 
 with navbar_col4:
     st.write("")  # Empty space for alignment
@@ -289,6 +307,7 @@ with st.sidebar:
             st.session_state.files_data = {}
             st.session_state.function_decisions = {}
             st.session_state.generated_docstrings = {}
+            st.session_state.load_failures = {}
             st.session_state.current_file_index = 0
             st.success("✅ Cleared! Ready for new files")
             st.rerun()
@@ -314,34 +333,73 @@ with st.sidebar:
             st.session_state.function_decisions = {}
             st.session_state.generated_docstrings = {}
             
+            st.session_state.load_failures = {}
+            
+            sources = []
             for uploaded_file in uploaded_files:
-                code = read_uploaded_file(uploaded_file)
-                file_key = uploaded_file.name
-                
-                functions = parse_functions(code)
+                try:
+                    sources.append((uploaded_file.name, read_uploaded_file(uploaded_file)))
+                except (SyntaxError, ValueError) as e:
+                    # Too large, an invalid coding cookie, or bytes that do not match the encoding
+                    st.session_state.load_failures[uploaded_file.name] = str(e)
+            
+            # Unchanged files come from the parse cache; the rest are parsed across
+            # worker processes, and one bad file does not stop the others
+            for (file_key, code), parsed in zip(sources, parse_sources(sources)):
+                if parsed["error"]:
+                    st.session_state.load_failures[file_key] = parsed["error"]
+                    continue
                 
                 st.session_state.files_data[file_key] = {
-                    "filename": uploaded_file.name,
+                    "filename": file_key,
                     "code": code,
-                    "functions": functions,
-                    "report": generate_coverage_report(functions),
+                    "file_hash": parsed["file_hash"],
+                    "functions": parsed["functions"],
+                    "report": parsed["report"],
+                    "parse_time": parsed["parse_time"],
+                    "cached": parsed["cached"],
                 }
             
-            st.success(f"✅ Loaded {len(uploaded_files)} file(s)")
+            st.success(f"✅ Loaded {len(st.session_state.files_data)} file(s)")
             st.rerun()
+        
+        for file_key, error in st.session_state.load_failures.items():
+            st.warning(f"⚠️ {file_key}: {error}")
     
     elif code_input:
         if st.button("📝 Process Code", use_container_width=True, type="primary"):
             try:
+                previous = st.session_state.files_data.get("pasted_code")
+                if previous:
+                    # Re-parse only the blocks that changed and keep results for untouched functions
+                    functions = reparse_functions(previous["code"], previous["functions"], code_input)
+                    unchanged = {
+                        f"pasted_code_{identity}": func
+                        for identity, func in unchanged_functions(previous["functions"], functions).items()
+                    }
+                    generated = {
+                        func_id: doc
+                        for func_id, doc in st.session_state.generated_docstrings.items()
+                        if func_id in unchanged
+                    }
+                    decisions = {
+                        func_id: {**decision, "function": unchanged[func_id]}
+                        for func_id, decision in st.session_state.function_decisions.items()
+                        if func_id in unchanged
+                    }
+                else:
+                    functions = parse_functions(code_input)
+                    generated, decisions = {}, {}
+                
                 # Clear previous data before processing new code
                 st.session_state.files_data = {}
-                st.session_state.function_decisions = {}
-                st.session_state.generated_docstrings = {}
+                st.session_state.function_decisions = decisions
+                st.session_state.generated_docstrings = generated
                 
-                functions = parse_functions(code_input)
                 st.session_state.files_data["pasted_code"] = {
                     "filename": "pasted_code.py",
                     "code": code_input,
+                    "file_hash": file_fingerprint(code_input),
                     "functions": functions,
                     "report": generate_coverage_report(functions),
                 }
@@ -349,6 +407,39 @@ with st.sidebar:
                 st.rerun()
             except SyntaxError as e:
                 st.error(f"❌ Syntax Error: {e}")
+    
+    st.divider()
+    st.header("⚙️ Settings")
+    
+    use_cache = st.checkbox(
+        "♻️ Reuse cached docstrings",
+        value=True,
+        help="Skip the LLM call when the same function source was already generated with this style"
+    )
+    batch_requests = st.checkbox(
+        "📦 Batch functions per request",
+        value=True,
+        help="During Generate All, pack several small functions into each LLM request"
+    )
+    cache_stats = get_cache().stats()
+    st.caption(
+        f"Cache: {cache_stats['entries']} entries • "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+    )
+    validation_stats = get_validation_cache().stats()
+    st.caption(
+        f"Validation memo: {validation_stats['entries']} entries • "
+        f"{validation_stats['hits']} hits / {validation_stats['misses']} misses"
+    )
+    
+    with st.expander("🔑 Provider Health"):
+        for health in key_health():
+            status = "⛔ cooling down" if health["circuit_open"] else "✅ healthy"
+            latency = f"{health['latency']:.2f}s" if health["latency"] is not None else "n/a"
+            st.caption(
+                f"{health['provider'].title()} key {health['key']}: {status} • "
+                f"latency {latency} • {health['failures']}/{health['requests']} failed"
+            )
 
 # MAIN CONTENT AREA
 
@@ -410,9 +501,46 @@ else:
         current_file = list(st.session_state.files_data.keys())[0]
     
     file_data = st.session_state.files_data[current_file]
+    if file_data.get("cached"):
+        st.caption("⚡ Unchanged since an earlier upload • loaded from the parse cache")
+    elif file_data.get("parse_time") is not None:
+        st.caption(f"⏱️ Parsed in {file_data['parse_time'] * 1000:.1f} ms")
     functions = file_data["functions"]
     report = file_data["report"]
     code = file_data["code"]
+    file_hash = file_data.get("file_hash") or file_fingerprint(code)
+    result_store = get_result_store()
+    
+    # Read through the shared store so work done in other sessions shows up here
+    shared_key = generation_key(engine, style)
+    for func in functions:
+        func_id = f"{current_file}_{function_identity(func)}"
+        shared = result_store.get(file_hash, function_identity(func))
+        if not shared:
+            continue
+        if func_id not in st.session_state.generated_docstrings and shared_key in shared["generated"]:
+            st.session_state.generated_docstrings[func_id] = shared["generated"][shared_key]
+        if func_id not in st.session_state.function_decisions and shared["decision"]:
+            st.session_state.function_decisions[func_id] = {**shared["decision"], "function": func}
+    
+    # Resume an interrupted Generate All from its journal, which survives crashes and restarts
+    job = get_job(file_hash, style, engine, create=False)
+    if job:
+        for identity, item in job.items().items():
+            func_id = f"{current_file}_{identity}"
+            docstring = item.get("docstring")
+            if func_id not in st.session_state.generated_docstrings and docstring and not is_api_error(docstring):
+                st.session_state.generated_docstrings[func_id] = docstring
+            if func_id not in st.session_state.function_decisions and item["state"] in ("accepted", "rejected"):
+                func = next((f for f in functions if function_identity(f) == identity), None)
+                if func:
+                    st.session_state.function_decisions[func_id] = {
+                        "status": item["state"], "docstring": item.get("docstring"), "function": func
+                    }
+        # Every function has been reviewed, so there is nothing left to resume
+        if job.decided(function_identity(func) for func in functions if not func["has_docstring"]):
+            discard_job(file_hash, style, engine)
+            job = None
     
     # COVERAGE REPORT SECTION
     
@@ -424,12 +552,7 @@ else:
         if func_id.startswith(f"{current_file}_")
     }
     approved_docstrings = {
-        decision["function"]["name"]: decision["docstring"]
-         for decision in current_file_decisions.values()
-         if decision.get("status") == "accepted" and decision.get("function")
-     }
-    accepted_function_keys = {
-        (decision["function"].get("class_name"), decision["function"]["name"])
+        function_identity(decision["function"]): decision["docstring"]
         for decision in current_file_decisions.values()
         if decision.get("status") == "accepted" and decision.get("function")
     }
@@ -465,11 +588,11 @@ else:
     
     functions_needing_docs = [
         f for f in functions
-        if not f["has_docstring"] and (f.get("class_name"), f["name"]) not in accepted_function_keys
+        if not f["has_docstring"] and function_identity(f) not in approved_docstrings
     ]
     functions_with_docs = [
         f for f in functions
-        if f["has_docstring"] or (f.get("class_name"), f["name"]) in accepted_function_keys
+        if f["has_docstring"] or function_identity(f) in approved_docstrings
     ]
     
     # Tabs for viewing functions
@@ -486,29 +609,72 @@ else:
             with gen_col1:
                 st.caption("Generate docstrings for all functions in this file and review them below.")
             with gen_col2:
-                if st.button("⚡ Generate All", use_container_width=True, type="primary"):
-                    with st.spinner("Generating docstrings for all functions..."):
-                        for idx, func in enumerate(functions_needing_docs):
-                            func_id = f"{current_file}_{func['name']}_{idx}"
-                            try:
-                                doc = generate_docstring(
-                                    func["source_code"],
-                                    function_name=func["name"],
-                                    args=func.get("args"),
-                                    style=style
-                                )
-                                st.session_state.generated_docstrings[func_id] = doc
-                            except Exception as e:
-                                st.error(f"Error generating docstring for {func['name']}: {e}")
-                        st.success("✅ All docstrings generated! Review and accept each one below.")
-                        st.rerun()
+                generate_all_clicked = st.button("⚡ Generate All", use_container_width=True, type="primary")
             
-            for idx, func in enumerate(functions_needing_docs):
-                func_id = f"{current_file}_{func['name']}_{idx}"
+            if generate_all_clicked:
+                job = get_job(file_hash, style, engine)
+                finished = job.completed() if job else {}
+                
+                # Functions finished by an earlier (interrupted) run are not sent to the LLM again
+                to_generate = []
+                for func in functions_needing_docs:
+                    item = finished.get(function_identity(func))
+                    if item and item.get("docstring") and not is_api_error(item["docstring"]):
+                        st.session_state.generated_docstrings[f"{current_file}_{function_identity(func)}"] = item["docstring"]
+                    else:
+                        to_generate.append(func)
+                
+                total_to_generate = len(functions_needing_docs)
+                completed = total_to_generate - len(to_generate)
+                progress_bar = st.progress(
+                    completed / total_to_generate if total_to_generate else 1.0,
+                    text=f"Generating docstrings ({completed}/{total_to_generate})..."
+                )
+                
+                # Results stream back in completion order; update progress as each one lands
+                problems = 0
+                for idx, doc, error in generate_docstrings_concurrently(
+                    to_generate, style=style, use_cache=use_cache,
+                    batched=batch_requests, engine=engine
+                ):
+                    func = to_generate[idx]
+                    func_id = f"{current_file}_{function_identity(func)}"
+                    if error:
+                        problems += 1
+                    if isinstance(error, TemplateFallbackError):
+                        # Show the template, but keep it out of the shared store and mark it for retry
+                        st.warning(f"⚠️ LLM unavailable for {func['name']}: showing an offline template docstring instead")
+                        st.session_state.generated_docstrings[func_id] = error.docstring
+                        if job:
+                            job.record(function_identity(func), "failed", error=str(error))
+                    elif error:
+                        st.error(f"Error generating docstring for {func['name']}: {error}")
+                        if job:
+                            job.record(function_identity(func), "failed", error=str(error))
+                    else:
+                        st.session_state.generated_docstrings[func_id] = doc
+                        result_store.record_generation(file_hash, function_identity(func), engine, style, doc)
+                        if job:
+                            job.record(function_identity(func), "generated", docstring=doc)
+                    completed += 1
+                    rate = f" • {job.progress()['throughput']:.1f}/s" if job else ""
+                    progress_bar.progress(
+                        completed / total_to_generate,
+                        text=f"Generated {completed}/{total_to_generate}{rate}: {func['name']}"
+                    )
+                
+                if problems:
+                    st.warning(f"⚠️ {problems} of {len(to_generate)} docstrings did not come from the LLM; run Generate All again to retry them.")
+                else:
+                    st.success("✅ All docstrings generated! Review and accept each one below.")
+                    st.rerun()
+            
+            for func in functions_needing_docs:
+                func_id = f"{current_file}_{function_identity(func)}"
                 
                 with st.container(border=True):
                     # Function header
-                    func_name_display = f"{func['class_name']}.{func['name']}" if func.get('is_method') else func['name']
+                    func_name_display = function_identity(func)
                     
                     col1, col2 = st.columns([0.85, 0.15])
                     with col1:
@@ -521,19 +687,49 @@ else:
                     
                     # Generate docstring if not already done
                     if func_id not in st.session_state.generated_docstrings:
+                        # Only oversized functions are trimmed, so only they need their AST node parsed
+                        if estimate_tokens(func["source_code"]) > DEFAULT_TOKEN_BUDGET:
+                            excerpt = build_function_excerpt(func["source_code"], func.get("node"))
+                            if excerpt["tokens_saved"]:
+                                st.caption(
+                                    f"✂️ Large function: prompt trimmed from ~{excerpt['original_tokens']} "
+                                    f"to ~{excerpt['prompt_tokens']} tokens ({excerpt['tokens_saved']} saved)"
+                                )
                         if st.button(f"🤖 Generate Docstring", key=f"gen_{func_id}"):
-                            with st.spinner("Generating docstring..."):
-                                try:
-                                    doc = generate_docstring(
-                                        func["source_code"],
-                                        function_name=func["name"],
-                                        args=func.get("args"),
-                                        style=style
-                                    )
+                            # Render the docstring as it streams in
+                            stream_preview = st.empty()
+                            streamed_doc = ""
+                            provider = None
+                            try:
+                                for provider, chunk in generate_docstring_stream_with_provider(
+                                    func["source_code"],
+                                    function_name=func["name"],
+                                    args=func.get("args"),
+                                    style=style,
+                                    use_cache=use_cache,
+                                    node=func.get("node"),
+                                    engine=engine
+                                ):
+                                    streamed_doc += chunk
+                                    stream_preview.code(f'"""{streamed_doc}"""', language="python")
+                                doc = format_docstring_pep257(streamed_doc)
+                                if provider is None:
+                                    st.error(f"Error generating docstring: {doc}")
+                                    if job:
+                                        job.record(function_identity(func), "failed", error=doc)
+                                elif provider == "local" and engine != "local":
+                                    st.warning("⚠️ LLM unavailable: showing an offline template docstring instead")
+                                    st.session_state.generated_docstrings[func_id] = doc
+                                    if job:
+                                        job.record(function_identity(func), "failed", error=str(TemplateFallbackError(doc)))
+                                else:
                                     st.session_state.generated_docstrings[func_id] = doc
+                                    result_store.record_generation(file_hash, function_identity(func), engine, style, doc)
+                                    if job:
+                                        job.record(function_identity(func), "generated", docstring=doc)
                                     st.rerun()
-                                except Exception as e:
-                                    st.error(f"Error generating docstring: {e}")
+                            except Exception as e:
+                                st.error(f"Error generating docstring: {e}")
                     
                     # Display and interact with docstring
                     if func_id in st.session_state.generated_docstrings:
@@ -557,7 +753,7 @@ else:
                             
                             # Show preview of edited version
                             st.markdown("**Preview of edited docstring:**")
-                            edit_errors = validate_docstring(edited_doc, function_name=func['name'])
+                            edit_errors = validate_function(func, edited_doc, rules=rules_for_style(style))
                             if edit_errors:
                                 st.warning(f"⚠️ {len(edit_errors)} validation issue(s)")
                                 for error in edit_errors:
@@ -575,12 +771,20 @@ else:
                                     use_container_width=True,
                                     type="primary"
                                 ):
+                                    if not edited_doc.strip():
+                                        st.error("The docstring is empty; write one or cancel the edit.")
+                                        st.stop()
                                     st.session_state.function_decisions[func_id] = {
                                         "status": "accepted",
                                         "docstring": edited_doc,
                                         "function": func
                                     }
                                     st.session_state.generated_docstrings[func_id] = edited_doc
+                                    result_store.record_decision(
+                                        file_hash, function_identity(func), st.session_state.function_decisions[func_id]
+                                    )
+                                    if job:
+                                        job.record(function_identity(func), "accepted", docstring=edited_doc)
                                     st.success("✅ Changes saved and accepted!")
                                     st.rerun()
                             
@@ -602,6 +806,11 @@ else:
                                         "docstring": displayed_doc,
                                         "function": func
                                     }
+                                    result_store.record_decision(
+                                        file_hash, function_identity(func), st.session_state.function_decisions[func_id]
+                                    )
+                                    if job:
+                                        job.record(function_identity(func), "accepted", docstring=displayed_doc)
                                     st.rerun()
                             
                             with btn_col2:
@@ -615,7 +824,9 @@ else:
                             
                             with btn_col3:
                                 if st.button("🔍 Validate", key=f"validate_{func_id}", use_container_width=True):
-                                    errors = validate_docstring(displayed_doc, function_name=func['name'])
+                                    errors = validate_function(func, displayed_doc, rules=rules_for_style(style))
+                                    if job and (job.get(function_identity(func)) or {}).get("state") in ("generated", "validated", "invalid"):
+                                        job.record(function_identity(func), "invalid" if errors else "validated", issues=errors)
                                     st.divider()
                                     if errors:
                                         error_count = len(errors)
@@ -630,6 +841,11 @@ else:
                             with btn_col4:
                                 if st.button("❌ Reject", key=f"reject_{func_id}", use_container_width=True):
                                     st.session_state.function_decisions[func_id] = {"status": "rejected"}
+                                    result_store.record_decision(
+                                        file_hash, function_identity(func), st.session_state.function_decisions[func_id]
+                                    )
+                                    if job:
+                                        job.record(function_identity(func), "rejected")
                                     st.rerun()
                         
                         # Status indicator
@@ -647,17 +863,10 @@ else:
             st.write(f"**{len(functions_with_docs)} functions** have docstrings:")
             
             for func in functions_with_docs:
-                func_name_display = f"{func['class_name']}.{func['name']}" if func.get('is_method') else func['name']
-                func_key = (func.get("class_name"), func["name"])
+                func_name_display = function_identity(func)
                 
                 # Find if this function has an approved docstring
-                approved_doc = None
-                for decision in current_file_decisions.values():
-                    if (decision.get("function", {}).get("class_name") == func.get("class_name") and 
-                        decision.get("function", {}).get("name") == func["name"] and
-                        decision.get("status") == "accepted"):
-                        approved_doc = decision.get("docstring")
-                        break
+                approved_doc = approved_docstrings.get(func_name_display)
                 
                 with st.container(border=True):
                     st.markdown(f"### ✅ {func_name_display}()")
@@ -691,19 +900,7 @@ else:
         st.info(f"✅ **{accepted_count} docstring(s) approved** - Ready to download!")
         
         # Prepare the updated code
-        docstrings_to_apply = {}
-        for func_id, decision in st.session_state.function_decisions.items():
-            if decision.get("status") == "accepted":
-                func = decision.get("function")
-                if func:
-                    func_name = func["name"]
-                    if func.get("is_method"):
-                        func_key = f"{func['class_name']}.{func_name}"
-                    else:
-                        func_key = func_name
-                    docstrings_to_apply[func_key] = decision["docstring"]
-
-        updated_code = apply_all_docstrings(code, docstrings_to_apply)
+        updated_code = apply_all_docstrings(code, approved_docstrings)
         
         # LIVE FILE PREVIEW
         st.markdown("### 📋 Final Code Preview (Before & After)")
@@ -0,0 +1,67 @@
+"""
+Benchmark single-pass apply_all_docstrings against the per-docstring insert loop.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_code_inserter [--sizes 100 200 400]
+
+Each size N builds a module with N functions (half of them methods) and
+applies a docstring to every one of them.
+"""
+import argparse
+import time
+
+from services.code_inserter import apply_all_docstrings, insert_docstring
+
+
+def build_module(count: int):
+    """Return (code, docstrings) for a synthetic module with `count` functions."""
+    parts = []
+    docstrings = {}
+    for i in range(count // 2):
+        parts.append(f"def func_{i}(a, b=1):\n    total = a + b\n    return total * {i}\n")
+        docstrings[f"func_{i}"] = f"Compute value {i}.\n\nArgs:\n    a: First value.\n    b: Second value."
+    parts.append("class Service:\n")
+    for i in range(count - count // 2):
+        parts.append(f"    def method_{i}(self, x):\n        return x + {i}\n")
+        docstrings[f"Service.method_{i}"] = f"Return x plus {i}."
+    return "\n".join(parts), docstrings
+
+
+def legacy_apply(code: str, docstrings: dict) -> str:
+    """The previous implementation: one insert_docstring call (and parse) per docstring."""
+    result = code
+    for func_identifier, docstring in docstrings.items():
+        if '.' in func_identifier:
+            class_name, function_name = func_identifier.rsplit('.', 1)
+            result = insert_docstring(result, function_name, docstring, class_name=class_name)
+        else:
+            result = insert_docstring(result, func_identifier, docstring)
+    return result
+
+
+def timed(fn, *args) -> tuple:
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400])
+    args = parser.parse_args()
+
+    print(f"{'functions':>10} {'lines':>7} {'loop (ms)':>11} {'single pass (ms)':>17} {'speedup':>8}")
+    for size in args.sizes:
+        code, docstrings = build_module(size)
+        expected, loop_time = timed(legacy_apply, code, docstrings)
+        actual, single_time = timed(apply_all_docstrings, code, docstrings)
+        assert actual == expected, f"outputs differ for {size} functions"
+        print(
+            f"{size:>10} {code.count(chr(10)) + 1:>7} {loop_time * 1000:>11.1f} "
+            f"{single_time * 1000:>17.1f} {loop_time / single_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark the offline template engine against the LLM path.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_local_engine [--repeat 50] [--llm-samples 3]
+
+The LLM path is only timed when API keys are configured.
+"""
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from services.api_manager import PROVIDER_CLIENTS
+from services.ast_parser import parse_functions
+from services.docstring_generator import generate_docstring
+from services.local_engine import synthesize_docstring
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_corpus() -> list:
+    """Parse every Python file in the repository into function records."""
+    functions = []
+    for path in sorted(REPO_ROOT.rglob("*.py")):
+        functions.extend(parse_functions(path.read_text(encoding="utf-8")))
+    return functions
+
+
+def bench_local(functions: list, repeat: int) -> list:
+    timings = []
+    for _ in range(repeat):
+        for func in functions:
+            started = time.perf_counter()
+            synthesize_docstring(func["source_code"], style="Google", node=func["node"])
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def bench_llm(functions: list, samples: int) -> list:
+    timings = []
+    for func in functions[:samples]:
+        started = time.perf_counter()
+        generate_docstring(func["source_code"], function_name=func["name"], args=func["args"], use_cache=False)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def report(label: str, timings: list):
+    print(
+        f"{label:<8} n={len(timings):<6} "
+        f"median={statistics.median(timings) * 1e6:>12.1f} us  "
+        f"mean={statistics.mean(timings) * 1e6:>12.1f} us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="passes of the local engine over the corpus")
+    parser.add_argument("--llm-samples", type=int, default=3, help="functions to send to the LLM (0 to skip)")
+    args = parser.parse_args()
+
+    functions = load_corpus()
+    print(f"Corpus: {len(functions)} functions")
+    report("local", bench_local(functions, args.repeat))
+
+    if PROVIDER_CLIENTS and args.llm_samples:
+        report("llm", bench_llm(functions, args.llm_samples))
+    else:
+        print("llm      skipped (no API keys configured)")
+
+
+if __name__ == "__main__":
+    main()
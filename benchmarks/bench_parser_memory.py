@@ -0,0 +1,92 @@
+"""
+Measure memory retained by parsed function records.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parser_memory [--copies 20]
+
+The corpus is every Python file in the repository, repeated `--copies` times
+as separate uploads. The figure reported is what stays allocated while the
+records are alive (the uploaded source text itself is excluded), i.e. what a
+Streamlit session keeps in `files_data`.
+"""
+import argparse
+import ast
+import gc
+import time
+import tracemalloc
+from pathlib import Path
+
+from services.ast_parser import build_qualname_index, parse_functions
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def legacy_parse(code: str) -> list:
+    """The previous record format: one dict per function holding its AST node and source copy."""
+    lines = code.splitlines()
+    functions = []
+    for qualname, entry in build_qualname_index(ast.parse(code)).items():
+        if entry["kind"] != "function":
+            continue
+        node = entry["node"]
+        source_lines = lines[node.lineno - 1:node.end_lineno]
+        indent = len(source_lines[0]) - len(source_lines[0].lstrip())
+        functions.append({
+            "name": node.name,
+            "qualname": qualname,
+            "args": [arg.arg for arg in node.args.args],
+            "has_docstring": ast.get_docstring(node) is not None,
+            "docstring": ast.get_docstring(node) or "",
+            "source_code": "\n".join(line[indent:] if line.strip() else "" for line in source_lines),
+            "line_number": node.lineno,
+            "end_line_number": node.end_lineno,
+            "class_name": entry["class_name"],
+            "is_method": entry["class_name"] is not None,
+            "node": node,
+            "original_indent": indent,
+        })
+    return functions
+
+
+def measure(parse, sources: list) -> tuple:
+    """Return (records, retained bytes, seconds) for parsing every source with `parse`."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    records = [parse(code) for code in sources]
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, retained, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--copies", type=int, default=20, help="times each repository file is uploaded")
+    args = parser.parse_args()
+
+    files = [path.read_text(encoding="utf-8") for path in sorted(REPO_ROOT.rglob("*.py"))]
+    # Distinct string objects per upload, as separate sessions/files would have
+    sources = [code + "\n" * copy for copy in range(args.copies) for code in files]
+    source_bytes = sum(len(code) for code in sources)
+
+    legacy, legacy_bytes, legacy_time = measure(legacy_parse, sources)
+    count = sum(len(records) for records in legacy)
+    del legacy
+    compact, compact_bytes, compact_time = measure(parse_functions, sources)
+    assert sum(len(records) for records in compact) == count
+
+    print(f"Corpus: {len(sources)} files, {count} functions, {source_bytes / 1e6:.1f} MB of source")
+    print(f"{'records':<14} {'retained (MB)':>14} {'per function (B)':>17} {'parse (ms)':>11}")
+    for label, retained, elapsed in (
+        ("dict + node", legacy_bytes, legacy_time),
+        ("FunctionInfo", compact_bytes, compact_time),
+    ):
+        print(f"{label:<14} {retained / 1e6:>14.2f} {retained / count:>17.0f} {elapsed * 1000:>11.1f}")
+    print(f"Reduction: {legacy_bytes / compact_bytes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark the docstring rule engine against the previous ad-hoc checks.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rule_engine [--copies 3]
+
+The corpus is every function docstring in the standard library plus local
+engine docstrings in each style for the same functions, repeated `--copies`
+times. Only the built-in rules are timed; pydocstyle is benchmarked by
+bench_validator. The "+ signature" rows also check documented parameters,
+returns, yields and raises against each function's AST summary.
+"""
+import argparse
+import ast
+import sysconfig
+import time
+from pathlib import Path
+
+from services.ast_parser import summarize_function
+from services.docstring_rules import DEFAULT_RULES, check_docstring, rules_for_style
+from services.local_engine import synthesize_docstring
+
+STDLIB = Path(sysconfig.get_paths()["stdlib"])
+
+
+def load_corpus(limit: int) -> list:
+    """Return (function name, docstring, signature) for up to `limit` stdlib functions, plus local engine docstrings."""
+    corpus = []
+    nodes = []
+    for path in sorted(STDLIB.glob("*.py")):
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8"))
+        except (SyntaxError, UnicodeDecodeError):
+            continue
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                docstring = ast.get_docstring(node)
+                if docstring:
+                    corpus.append((node.name, docstring, summarize_function(node)))
+                    nodes.append(node)
+        if len(corpus) >= limit:
+            break
+    signatures = [signature for _, _, signature in corpus]
+    for style in ("Google", "NumPy", "reST"):
+        corpus.extend(
+            (node.name, synthesize_docstring(style=style, node=node), signature)
+            for node, signature in zip(nodes, signatures)
+        )
+    return corpus
+
+
+def legacy_checks(docstring: str) -> list:
+    """The previous built-in checks, which rebuilt their word tables on every call."""
+    errors = []
+
+    # Parse docstring lines
+    raw_lines = docstring.splitlines()
+    lines = [line.rstrip() for line in raw_lines]
+
+    # Trim leading/trailing blank lines for analysis
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    while lines and not lines[-1].strip():
+        lines.pop()
+
+    if not lines:
+        return ["[D100] Missing docstring in public function"]
+
+    summary = lines[0].strip()
+
+    # D400: First line should end with a period
+    if not summary.endswith("."):
+        errors.append("[D400] First line should end with a period.")
+
+    # D401: First line should be in imperative mood
+    non_imperative = [
+        "returns", "computes", "calculates", "determines", "gets",
+        "retrieves", "identifies", "processes", "handles", "represents",
+        "defines", "performs", "executes", "stores", "creates",
+        "generates", "initializes", "sets", "updates", "modifies",
+        "changes", "converts", "transforms", "formats", "parses",
+        "analyzes", "checks", "validates", "verifies", "prints",
+        "displays", "shows", "outputs", "reads", "writes",
+        "opens", "closes", "saves", "deletes", "removes",
+        "sorts", "searches", "finds", "contains", "has",
+        "is", "are", "was", "were", "be", "being", "been"
+    ]
+    first_word = summary.split()[0].lower().rstrip(".,:;!?")
+    if first_word in non_imperative:
+        # Convert to imperative form
+        imperative_map = {
+            "calculates": "Calculate", "computes": "Compute", "determines": "Determine",
+            "gets": "Get", "retrieves": "Retrieve", "identifies": "Identify",
+            "processes": "Process", "handles": "Handle", "represents": "Represent",
+            "defines": "Define", "performs": "Perform", "executes": "Execute",
+            "stores": "Store", "creates": "Create", "generates": "Generate",
+            "initializes": "Initialize", "sets": "Set", "updates": "Update",
+            "modifies": "Modify", "changes": "Change", "converts": "Convert",
+            "transforms": "Transform", "formats": "Format", "parses": "Parse",
+            "analyzes": "Analyze", "checks": "Check", "validates": "Validate",
+            "verifies": "Verify", "prints": "Print", "displays": "Display",
+            "shows": "Show", "outputs": "Output", "reads": "Read", "writes": "Write",
+            "opens": "Open", "closes": "Close", "saves": "Save", "deletes": "Delete",
+            "removes": "Remove", "sorts": "Sort", "searches": "Search", "finds": "Find",
+            "contains": "Include", "returns": "Return", "is": "Be", "are": "Be",
+            "was": "Be", "were": "Be", "being": "Be", "been": "Be",
+        }
+        imperative = imperative_map.get(first_word, first_word.capitalize())
+        errors.append(f"[D401] First line should be in imperative mood; change '{summary.split()[0]}' to '{imperative}'.")
+
+    # D402: First line should not be a function signature
+    if "(" in summary and ")" in summary:
+        errors.append("[D402] First line should not be a function signature.")
+
+    # D213: Multi-line docstring summary should be on the first line
+    if len(lines) > 1:
+        if lines[1].strip():
+            # Second line has content - check if this is intentional
+            if not summary.endswith(":"):
+                errors.append("[D213] Multi-line docstring summary should be on the first line; use a period to end the summary.")
+
+    # D209: Multi-line docstring closing quotes should be on a separate line  
+    if len(lines) > 2:
+        last_line = lines[-1].strip()
+        second_last = lines[-2].strip() if len(lines) > 1 else ""
+        # If last line has content and isn't just closing quotes
+        if last_line and last_line not in ('"""', "'''", 'r"""', "r'''"):
+            errors.append("[D209] Multi-line docstring closing quotes should be on a separate line.")
+
+    # D301: Use r""" if backslashes in docstring
+    if any("\\" in line for line in lines):
+        errors.append("[D301] Use r\"\"\" if any backslashes in a docstring.")
+
+    # D206: Docstring should be indented with spaces, not tabs  
+    if any("\t" in line for line in lines):
+        errors.append("[D206] Docstring should be indented with spaces, not tabs.")
+
+    return errors
+
+
+def time_run(check, corpus: list) -> float:
+    """Return the seconds taken to check every docstring in the corpus."""
+    started = time.perf_counter()
+    for name, docstring, signature in corpus:
+        check(docstring, name, signature)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--copies", type=int, default=3, help="times the corpus is checked")
+    parser.add_argument("--limit", type=int, default=5000, help="stdlib docstrings to collect")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.limit) * args.copies
+    print(f"Corpus: {len(corpus)} docstrings")
+    print(f"{'checks':<40} {'total (ms)':>11} {'per docstring (us)':>19} {'issues':>7}")
+
+    runs = [("previous ad-hoc checks", lambda docstring, name, signature: legacy_checks(docstring))]
+    runs.append((
+        "engine, PEP 257 rules",
+        lambda docstring, name, signature: check_docstring(docstring, name, DEFAULT_RULES),
+    ))
+    for style in ("Google", "NumPy", "reST"):
+        rules = rules_for_style(style)
+        runs.append((
+            f"engine, PEP 257 + {style}",
+            lambda docstring, name, signature, rules=rules: check_docstring(docstring, name, rules),
+        ))
+        runs.append((
+            f"engine, PEP 257 + {style} + signature",
+            lambda docstring, name, signature, rules=rules: check_docstring(docstring, name, rules, signature),
+        ))
+
+    for label, check in runs:
+        issues = sum(len(check(docstring, name, signature)) for name, docstring, signature in corpus)
+        elapsed = time_run(check, corpus)
+        print(f"{label:<40} {elapsed * 1000:>11.1f} {elapsed / len(corpus) * 1e6:>19.2f} {issues:>7}")
+
+
+if __name__ == "__main__":
+    main()
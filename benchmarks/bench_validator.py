@@ -0,0 +1,84 @@
+"""
+Benchmark in-memory pydocstyle validation against the temp-file round trip.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_validator [--calls 500]
+
+The previous implementation wrote each docstring into a temporary file,
+built a fresh pydocstyle configuration and checker, checked the file and
+deleted it. `legacy_validate` reproduces that with pydocstyle's public
+`check()` entry point, which builds its checker on every call.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from pydocstyle.checker import check
+from pydocstyle.violations import conventions
+
+from services.validator import _validate_with_pydocstyle, validate_docstring
+
+DOCSTRINGS = [
+    "Return the sum of two numbers.",
+    "calculates the total\nof all items",
+    "Parse the configuration file.\n\nArgs:\n    path: Location of the file.\n\nReturns:\n    The parsed settings.",
+    "Compute a path like C:\\temp.",
+    "Load data(from disk)",
+]
+
+
+def legacy_validate(docstring: str, function_name: str = "temp_func") -> list:
+    """The previous implementation: a temporary file and a new checker for every docstring."""
+    temp_code = f'''def {function_name}():
+    """{docstring}"""
+    pass
+'''
+    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+        f.write(temp_code)
+        temp_file = f.name
+    try:
+        select = set(conventions.pep257) - {"D100", "D104"}
+        return [f"[{error.code}] {error.short_desc}" for error in check([temp_file], select=select)]
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def time_calls(validate, calls: int) -> list:
+    """Return the latency of each of `calls` validations, in microseconds."""
+    timings = []
+    for i in range(calls):
+        docstring = DOCSTRINGS[i % len(DOCSTRINGS)]
+        started = time.perf_counter()
+        validate(docstring, "process_items")
+        timings.append((time.perf_counter() - started) * 1e6)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500, help="validations per implementation")
+    args = parser.parse_args()
+
+    # Warm up imports and the shared checker
+    legacy_validate(DOCSTRINGS[0])
+    validate_docstring(DOCSTRINGS[0])
+
+    print(f"{'implementation':<26} {'median (us)':>12} {'p95 (us)':>10}")
+    results = {}
+    for label, validate in (
+        ("temp file + new checker", legacy_validate),
+        ("in-memory, shared checker", _validate_with_pydocstyle),
+        ("validate_docstring (memo)", validate_docstring),
+    ):
+        timings = sorted(time_calls(validate, args.calls))
+        results[label] = statistics.median(timings)
+        print(f"{label:<26} {results[label]:>12.0f} {timings[int(len(timings) * 0.95)]:>10.0f}")
+    print(f"Speedup: {results['temp file + new checker'] / results['in-memory, shared checker']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
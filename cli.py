@@ -0,0 +1,322 @@
+"""
+Generate docstrings for every Python file under a directory, without the web UI.
+
+Examples:
+
+    python cli.py src/ --in-place
+    python cli.py src/ --output documented/ --engine local
+    python cli.py . --in-place --checkpoint .docstrings.jsonl   # rerun to resume
+
+Each file is parsed, docstrings are generated for its undocumented functions
+(in parallel, across files), validated, and inserted in a single pass. With a
+checkpoint, every generated docstring and finished file is journaled as it
+completes; running the command again skips finished files and reuses
+docstrings generated for the rest.
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+from pathlib import Path
+
+from services.ast_parser import function_identity, source_fingerprint, summarize_functions
+from services.batch_parser import parse_sources
+from services.code_inserter import apply_all_docstrings
+from services.docstring_generator import generate_docstrings_concurrently
+from services.job_journal import JobJournal
+from services.result_store import file_fingerprint
+from services.validator import rules_for_style, validate_many
+from utils.file_utils import detect_source_encoding, read_source
+
+# Directories never worth documenting
+SKIPPED_DIRS = {"__pycache__", "node_modules", "venv", "env", "build", "dist", "site-packages"}
+
+
+def find_python_files(root: Path, exclude=()) -> list:
+    """
+    List the Python files under `root`, skipping hidden and tool directories.
+
+    Args:
+        root: Directory (or single file) to scan
+        exclude: Extra directory names to skip
+
+    Returns:
+        Sorted list of file paths
+    """
+    if root.is_file():
+        return [root]
+
+    skipped = SKIPPED_DIRS | set(exclude)
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".") and name not in skipped]
+        paths.extend(Path(dirpath) / name for name in filenames if name.endswith(".py"))
+    return sorted(paths)
+
+
+class BatchRun:
+    """
+    Generate, validate and insert docstrings for a list of files, file by file.
+
+    With a journal, every function's generation and validation and every
+    finished file are recorded as they complete. On a rerun, finished files
+    are skipped and journaled docstrings of unchanged functions are reused
+    instead of being generated again.
+    """
+
+    def __init__(self, root: Path, args, journal: JobJournal = None):
+        self.root = root
+        self.args = args
+        self.journal = journal
+        self.totals = {
+            "files": 0, "skipped": 0, "documented": 0, "resumed": 0, "invalid": 0, "failed": 0, "file_errors": 0,
+        }
+
+    def run(self, paths: list):
+        total = len(paths)
+        for start in range(0, total, self.args.batch_files):
+            batch = []
+            for path in paths[start:start + self.args.batch_files]:
+                relative = path.relative_to(self.root).as_posix() if path != self.root else path.name
+                try:
+                    with path.open("rb") as handle:
+                        encoding = detect_source_encoding(handle)
+                        code = read_source(handle, encoding=encoding)
+                except (OSError, SyntaxError, ValueError) as e:
+                    self._report(relative, f"read failed: {e}")
+                    self.totals["file_errors"] += 1
+                    continue
+                if self._file_finished(relative, code):
+                    self.totals["skipped"] += 1
+                    continue
+                batch.append((relative, path, code, encoding))
+            self._run_batch(batch)
+            self._progress(min(start + self.args.batch_files, total), total)
+
+    def _file_finished(self, relative: str, code: str) -> bool:
+        record = self.journal.get(f"file:{relative}") if self.journal else None
+        return (
+            record is not None
+            and record["state"] == "done"
+            and file_fingerprint(code) in (record["source_hash"], record["output_hash"])
+        )
+
+    def _run_batch(self, batch: list):
+        parsed = parse_sources([(relative, code) for relative, _, code, _ in batch], max_workers=self.args.parse_workers)
+
+        # Functions of every file in the batch share one worker pool
+        targets = []
+        pending = {}
+        files = {}
+        for (relative, path, code, encoding), result in zip(batch, parsed):
+            if result["error"]:
+                self._report(relative, result["error"])
+                self.totals["file_errors"] += 1
+                continue
+            state = files[relative] = {
+                "path": path, "code": code, "encoding": encoding,
+                "docstrings": {}, "unvalidated": {}, "resumed": 0, "invalid": 0, "failed": 0,
+            }
+            pending[relative] = 0
+            for func in result["functions"]:
+                if func["has_docstring"] and not self.args.overwrite:
+                    continue
+                if not self._resume_function(relative, func, state):
+                    pending[relative] += 1
+                    targets.append((relative, func))
+
+        for relative in [name for name, count in pending.items() if count == 0]:
+            self._finish(relative, files[relative])
+
+        for idx, doc, error in generate_docstrings_concurrently(
+            [func for _, func in targets],
+            style=self.args.style,
+            max_workers=self.args.workers,
+            use_cache=not self.args.no_cache,
+            batched=self.args.batched,
+            engine=self.args.engine,
+        ):
+            relative, func = targets[idx]
+            item_id = f"{relative}::{function_identity(func)}"
+            if error:
+                files[relative]["failed"] += 1
+                self._record(item_id, "failed", error=str(error))
+            else:
+                self._record(item_id, "generated", docstring=doc, source_hash=source_fingerprint(func["source_code"]))
+                files[relative]["unvalidated"][function_identity(func)] = (func, doc)
+
+            pending[relative] -= 1
+            if pending[relative] == 0:
+                self._finish(relative, files[relative])
+
+    def _resume_function(self, relative: str, func, state: dict) -> bool:
+        """Reuse a docstring journaled by an earlier run if the function is unchanged."""
+        item = self.journal.get(f"{relative}::{function_identity(func)}") if self.journal else None
+        if (
+            item is None
+            or item["state"] not in ("generated", "validated", "invalid")
+            or item.get("source_hash") != source_fingerprint(func["source_code"])
+        ):
+            return False
+        state["resumed"] += 1
+        if item.get("issues") is None:
+            state["unvalidated"][function_identity(func)] = (func, item["docstring"])
+        else:
+            self._accept(relative, func, item["docstring"], item["issues"], state)
+        return True
+
+    def _validate(self, relative: str, state: dict):
+        """Validate the file's new docstrings together, against signatures read in one pass over the file."""
+        unvalidated = state["unvalidated"]
+        if not unvalidated:
+            return
+        signatures = summarize_functions(state["code"])
+        results = validate_many(
+            {identity: doc for identity, (_, doc) in unvalidated.items()},
+            function_names={identity: func["name"] for identity, (func, _) in unvalidated.items()},
+            rules=rules_for_style(self.args.style),
+            signatures={identity: signatures.get(identity) for identity in unvalidated},
+        )
+        for identity, (func, doc) in unvalidated.items():
+            issues = results[identity]
+            self._record(f"{relative}::{identity}", "invalid" if issues else "validated", issues=issues)
+            self._accept(relative, func, doc, issues, state)
+        unvalidated.clear()
+
+    def _accept(self, relative: str, func, doc: str, issues: list, state: dict):
+        if self.args.skip_invalid and issues:
+            state["invalid"] += 1
+        else:
+            state["docstrings"][function_identity(func)] = doc
+
+    def _finish(self, relative: str, state: dict):
+        self._validate(relative, state)
+        output = apply_all_docstrings(state["code"], state["docstrings"])
+        try:
+            ast.parse(output)
+        except SyntaxError as e:
+            # Never write a file that no longer compiles; count its docstrings as failed
+            self._report(relative, f"insertion produced invalid code ({e}); file left unchanged")
+            state["failed"] += len(state["docstrings"])
+            state["docstrings"] = {}
+            output = state["code"]
+        destination = state["path"] if self.args.in_place else Path(self.args.output) / relative
+        if output != state["code"] or not self.args.in_place:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            # Same encoding (and BOM) and line endings as the original
+            destination.write_text(output, encoding=state["encoding"], newline="")
+
+        self.totals["files"] += 1
+        self.totals["documented"] += len(state["docstrings"])
+        self.totals["resumed"] += state["resumed"]
+        self.totals["invalid"] += state["invalid"]
+        self.totals["failed"] += state["failed"]
+        if state["docstrings"] or state["failed"] or state["invalid"]:
+            self._report(
+                relative,
+                f"{len(state['docstrings'])} documented, {state['invalid']} invalid, {state['failed']} failed",
+            )
+
+        # Files with failed generations are retried on the next run
+        self._record(
+            f"file:{relative}",
+            "done" if not state["failed"] else "partial",
+            source_hash=file_fingerprint(state["code"]),
+            output_hash=file_fingerprint(output),
+            documented=len(state["docstrings"]),
+        )
+
+    def _record(self, item_id: str, state: str, **fields):
+        if self.journal is not None:
+            self.journal.record(item_id, state, **fields)
+
+    def _report(self, relative: str, message: str):
+        if not self.args.quiet:
+            print(f"{relative}: {message}", file=sys.stderr)
+
+    def _progress(self, done: int, total: int):
+        if not self.args.quiet:
+            rate = f", {self.journal.progress()['throughput']:.1f} items/s" if self.journal else ""
+            print(f"[{done}/{total}] files scanned{rate}", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="\n".join(__doc__.strip().splitlines()[1:]),
+    )
+    parser.add_argument("root", type=Path, help="directory (or file) to document")
+    destination = parser.add_mutually_exclusive_group(required=True)
+    destination.add_argument("--in-place", action="store_true", help="rewrite the files in place")
+    destination.add_argument("--output", metavar="DIR", help="write the documented tree to DIR")
+    parser.add_argument("--style", choices=["Google", "NumPy", "reST"], default="Google")
+    parser.add_argument("--engine", choices=["llm", "local"], default="llm",
+                        help="LLM providers or the offline template engine")
+    parser.add_argument("--overwrite", action="store_true", help="also replace existing docstrings")
+    parser.add_argument("--skip-invalid", action="store_true",
+                        help="do not insert docstrings that fail PEP 257, --style section or signature checks")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="concurrent generation requests (defaults to the providers' limit)")
+    parser.add_argument("--parse-workers", type=int, default=None, help="processes used for parsing")
+    parser.add_argument("--batch-files", type=int, default=50, help="files parsed and generated together")
+    parser.add_argument("--batched", action="store_true", help="pack several functions into each LLM request")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the docstring cache")
+    parser.add_argument("--exclude", action="append", default=[], metavar="NAME",
+                        help="directory name to skip (repeatable)")
+    parser.add_argument("--checkpoint", type=Path, metavar="FILE",
+                        help="JSONL job journal of finished work; rerun with the same file to resume")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    root = args.root.resolve()
+    if not root.exists():
+        print(f"error: {args.root} does not exist", file=sys.stderr)
+        return 2
+
+    paths = find_python_files(root, exclude=args.exclude)
+    if args.output:
+        output = Path(args.output).resolve()
+        # Never document our own output when it lives inside the scanned tree
+        paths = [path for path in paths if output not in path.parents]
+
+    journal = None
+    if args.checkpoint:
+        journal = JobJournal(str(args.checkpoint), meta={"root": str(root), "style": args.style, "engine": args.engine})
+        if (journal.meta.get("style"), journal.meta.get("engine")) != (args.style, args.engine):
+            print(
+                f"error: {args.checkpoint} was written with --style {journal.meta.get('style')} "
+                f"--engine {journal.meta.get('engine')}; use the same options or a new checkpoint",
+                file=sys.stderr,
+            )
+            journal.close()
+            return 2
+
+    started = time.perf_counter()
+    run = BatchRun(root if root.is_dir() else root.parent, args, journal)
+    try:
+        run.run(paths)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun with the same --checkpoint to resume.", file=sys.stderr)
+        return 130
+    finally:
+        if journal is not None:
+            journal.close()
+
+    elapsed = time.perf_counter() - started
+    totals = run.totals
+    print(
+        f"{totals['files']} files processed ({totals['skipped']} already done, {totals['file_errors']} unreadable), "
+        f"{totals['documented']} docstrings inserted ({totals['resumed']} resumed from the checkpoint), "
+        f"{totals['invalid']} invalid, {totals['failed']} failed "
+        f"in {elapsed:.1f}s ({totals['documented'] / elapsed if elapsed else 0:.1f} docstrings/s)"
+    )
+    return 1 if totals["failed"] or totals["file_errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
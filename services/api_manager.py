@@ -1,8 +1,15 @@
+import hashlib
 import os
-import google.generativeai as genai
-from openai import OpenAI
+import threading
+import time
+from google.ai import generativelanguage as glm
+from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+from openai import OpenAI, RateLimitError
 from dotenv import load_dotenv
 
+from services.key_scheduler import KeyScheduler
+from services.singleflight import SingleFlight
+
 load_dotenv()
 
 # Collect all available Google and OpenAI keys
@@ -15,6 +22,9 @@ GOOGLE_KEYS = [key for key in GOOGLE_KEYS if key]  # Filter out None values
 
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
 
+GOOGLE_MODEL = "models/gemini-flash-lite-latest"
+OPENAI_MODEL = "gpt-3.5-turbo"
+
 # Create alternating key rotation: Google 1, OpenAI, Google 2, OpenAI, Google 3, OpenAI
 ALL_KEYS = []
 max_keys = max(len(GOOGLE_KEYS), 1)
@@ -24,49 +34,291 @@ for i in range(max_keys):
     if OPENAI_KEY:
         ALL_KEYS.append(("openai", OPENAI_KEY))
 
-OPENAI_CLIENT = OpenAI(api_key=OPENAI_KEY) if OPENAI_KEY else None
+# Offline template engine (services/local_engine.py), always tried after the remote keys
+ENABLE_LOCAL_PROVIDER = os.getenv("ENABLE_LOCAL_PROVIDER", "1") == "1"
+LOCAL_KEY = ("local", None)
+if ENABLE_LOCAL_PROVIDER:
+    ALL_KEYS.append(LOCAL_KEY)
 
-# Global counter for round-robin key selection
-_current_key_index = 0
+# Identifies the set of models that may answer a prompt (used as part of cache keys)
+MODEL_SIGNATURE = "|".join(
+    model for model, enabled in ((GOOGLE_MODEL, GOOGLE_KEYS), (OPENAI_MODEL, OPENAI_KEY)) if enabled
+)
 
-def generate_with_fallback(prompt: str) -> str:
-    """Generate content using keys in round-robin rotation for load balancing."""
-    global _current_key_index
+
+def _build_client(key_type: str, key_value: str):
+    """
+    Build a long-lived client bound to a single API key.
+    
+    Args:
+        key_type: Provider name ("google" or "openai")
+        key_value: The API key
     
-    if not ALL_KEYS:
-        return "API Error: No API keys configured"
+    Returns:
+        A GenerativeServiceClient (Google) or OpenAI client that can be shared across threads
+    """
+    if key_type == "google":
+        # A service client per key, rather than genai.configure()'s process-global
+        # client, so concurrent requests on different keys never share credentials
+        return glm.GenerativeServiceClient(client_options={"api_key": key_value})
+    return OpenAI(api_key=key_value)
+
+
+# Provider client registry: one client per distinct key, built once at startup so
+# connections (gRPC channels / HTTP pools) are reused across requests
+PROVIDER_CLIENTS = {}
+for _key in ALL_KEYS:
+    if _key != LOCAL_KEY and _key not in PROVIDER_CLIENTS:
+        PROVIDER_CLIENTS[_key] = _build_client(*_key)
+
+OPENAI_CLIENT = PROVIDER_CLIENTS.get(("openai", OPENAI_KEY))
+
+# Concurrency limits: each distinct key may serve this many requests at once
+MAX_CONCURRENCY_PER_KEY = int(os.getenv("MAX_CONCURRENCY_PER_KEY", "4"))
+
+PROVIDER_LIMITS = {}
+for _key_type in dict.fromkeys(key_type for key_type, _ in PROVIDER_CLIENTS):
+    _distinct_keys = {value for key_type, value in PROVIDER_CLIENTS if key_type == _key_type}
+    PROVIDER_LIMITS[_key_type] = len(_distinct_keys) * MAX_CONCURRENCY_PER_KEY
+
+_provider_semaphores = {
+    key_type: threading.BoundedSemaphore(limit) for key_type, limit in PROVIDER_LIMITS.items()
+}
+
+# Health-aware ordering of the distinct keys (replaces plain round-robin)
+_scheduler = KeyScheduler(list(PROVIDER_CLIENTS))
+
+# Deduplicates identical prompts that are in flight at the same time
+_single_flight = SingleFlight()
+
+
+def _candidate_keys() -> list:
+    """Return the keys to try for one request: healthy remote keys first, then the local engine."""
+    candidates = _scheduler.candidates()
+    if ENABLE_LOCAL_PROVIDER:
+        candidates.append(LOCAL_KEY)
+    return candidates
+
+
+def is_api_error(text: str) -> bool:
+    """Return True if `text` is an error message produced by generate_with_fallback."""
+    return text.startswith("API Error:")
+
+
+def max_concurrency() -> int:
+    """Return the total number of requests all providers can serve at once."""
+    return max(sum(PROVIDER_LIMITS.values()), 1)
+
+
+def key_health() -> list:
+    """
+    Report scheduler statistics for each configured key.
+    
+    Returns:
+        List of dicts with provider name, key number and health metrics (no key values)
+    """
+    report = []
+    for number, ((key_type, _), health) in enumerate(_scheduler.snapshot().items(), 1):
+        report.append({"provider": key_type, "key": number, **health})
+    return report
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    """Return True if the provider rejected the request for rate-limit or quota reasons."""
+    if isinstance(error, (RateLimitError, ResourceExhausted, TooManyRequests)):
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+def _google_request(prompt: str):
+    """Build a single-turn Gemini request for `prompt`."""
+    return glm.GenerateContentRequest(
+        model=GOOGLE_MODEL,
+        contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+    )
+
+
+def _google_text(response) -> str:
+    """Return the text of a Gemini response (or stream chunk); "" if it has no text parts."""
+    if not response.candidates:
+        return ""
+    return "".join(part.text for part in response.candidates[0].content.parts)
+
+
+def _call_provider(key: tuple, prompt: str) -> str:
+    """Send `prompt` to the provider that owns `key` and return the response text."""
+    key_type, _ = key
+    client = PROVIDER_CLIENTS[key]
+    if key_type == "google":
+        response = client.generate_content(request=_google_request(prompt))
+        text = _google_text(response)
+        if not text:
+            # e.g. blocked by a safety filter; let the next key try
+            raise ValueError(f"Gemini returned no text (block reason: {response.prompt_feedback.block_reason.name})")
+        return text
     
-    num_keys = len(ALL_KEYS)
-    start_index = _current_key_index
+    response = client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    return response.choices[0].message.content
+
+
+def _stream_provider(key: tuple, prompt: str):
+    """Send `prompt` to the provider that owns `key` and yield response text as it arrives."""
+    key_type, _ = key
+    client = PROVIDER_CLIENTS[key]
+    if key_type == "google":
+        for chunk in client.stream_generate_content(request=_google_request(prompt)):
+            text = _google_text(chunk)
+            if text:
+                yield text
+        return
     
-    # Try each key starting from current rotation position
-    for attempt in range(num_keys):
-        current_index = (_current_key_index + attempt) % num_keys
-        key_type, key_value = ALL_KEYS[current_index]
+    stream = client.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        stream=True
+    )
+    for event in stream:
+        if event.choices and event.choices[0].delta.content:
+            yield event.choices[0].delta.content
+
+
+def _generate_uncoalesced(prompt: str, local_fallback=None) -> tuple:
+    """Try the candidate keys in order and return (text, provider); provider is None on error."""
+    last_error = None
+    for key in _candidate_keys():
+        key_type, _ = key
+        if key == LOCAL_KEY:
+            if local_fallback is None:
+                continue
+            try:
+                return local_fallback(), key_type
+            except Exception as e:
+                last_error = e
+                continue
         
         try:
-            if key_type == "google":
-                genai.configure(api_key=key_value)
-                model = genai.GenerativeModel("models/gemini-flash-lite-latest")
-                response = model.generate_content(prompt)
-                # Move to next key for next call (round-robin)
-                _current_key_index = (current_index + 1) % num_keys
-                return response.text
-            
-            elif key_type == "openai" and OPENAI_CLIENT:
-                response = OPENAI_CLIENT.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                # Move to next key for next call (round-robin)
-                _current_key_index = (current_index + 1) % num_keys
-                return response.choices[0].message.content
+            # Bound the number of in-flight requests per provider
+            with _provider_semaphores[key_type]:
+                started = time.monotonic()
+                text = _call_provider(key, prompt)
+        except Exception as e:
+            # Key failed, record it and try the next one
+            _scheduler.record_failure(key, rate_limited=_is_rate_limit_error(e))
+            last_error = e
+            continue
         
+        _scheduler.record_success(key, time.monotonic() - started)
+        return text, key_type
+    
+    if last_error is None:
+        return "API Error: No API keys configured", None
+    # All keys exhausted
+    return f"API Error: All keys failed. Last error: {str(last_error)}", None
+
+
+def _stream_uncoalesced(prompt: str, local_fallback=None):
+    """Try the candidate keys in order, yielding (provider, chunk) pairs; provider is None on error."""
+    last_error = None
+    for key in _candidate_keys():
+        key_type, _ = key
+        if key == LOCAL_KEY:
+            if local_fallback is None:
+                continue
+            try:
+                text = local_fallback()
+            except Exception as e:
+                last_error = e
+                continue
+            yield key_type, text
+            return
+        
+        produced_output = False
+        try:
+            # Bound the number of in-flight requests per provider
+            with _provider_semaphores[key_type]:
+                started = time.monotonic()
+                for chunk in _stream_provider(key, prompt):
+                    produced_output = True
+                    yield key_type, chunk
         except Exception as e:
-            # Key failed, try next one
-            if attempt == num_keys - 1:
-                # All keys exhausted
-                return f"API Error: All keys failed. Last error: {str(e)}"
+            _scheduler.record_failure(key, rate_limited=_is_rate_limit_error(e))
+            if produced_output:
+                raise
+            last_error = e
             continue
+        
+        _scheduler.record_success(key, time.monotonic() - started)
+        return
+    
+    if last_error is None:
+        yield None, "API Error: No API keys configured"
+        return
+    # All keys exhausted
+    yield None, f"API Error: All keys failed. Last error: {str(last_error)}"
+
+
+def _prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def generate_with_provider(prompt: str, local_fallback=None) -> tuple:
+    """
+    Generate content like generate_with_fallback, also reporting which provider answered.
+    
+    Identical prompts already in flight are coalesced: concurrent callers share one
+    upstream request and its result.
+    
+    Args:
+        prompt: The prompt to send
+        local_fallback: Optional zero-argument callable used as the "local" provider
+            once every remote key has failed (or none is configured)
+    
+    Returns:
+        Tuple of (text, provider) where provider is "google", "openai", "local",
+        or None when text is an "API Error: ..." message
+    """
+    return _single_flight.do(_prompt_key(prompt), lambda: _generate_uncoalesced(prompt, local_fallback))
+
+
+def generate_with_fallback(prompt: str, local_fallback=None) -> str:
+    """
+    Generate content with the healthiest available key, falling back through the rest.
+    
+    Args:
+        prompt: The prompt to send
+        local_fallback: Optional zero-argument callable used as the "local" provider
+            once every remote key has failed (or none is configured)
+    
+    Returns:
+        The generated text, or an "API Error: ..." message
+    """
+    text, _ = generate_with_provider(prompt, local_fallback)
+    return text
+
+
+def stream_with_provider(prompt: str, local_fallback=None):
+    """
+    Stream content like stream_with_fallback, yielding (provider, chunk) pairs.
+    
+    Identical prompts already streaming are coalesced: followers replay the
+    leader's chunks instead of opening a second upstream stream.
+    """
+    return _single_flight.stream(_prompt_key(prompt), lambda: _stream_uncoalesced(prompt, local_fallback))
+
+
+def stream_with_fallback(prompt: str, local_fallback=None):
+    """
+    Stream content from the healthiest available key, yielding text chunks.
     
-    return "API Error: Unexpected error in key rotation"
+    Falls back to the next key only while nothing has been yielded yet; a
+    provider that fails mid-stream raises, since partial output cannot be
+    taken back. Errors before any output are yielded as a single
+    "API Error: ..." chunk, mirroring generate_with_fallback. The optional
+    `local_fallback` callable answers in a single chunk when every remote key fails.
+    """
+    for _, chunk in stream_with_provider(prompt, local_fallback):
+        yield chunk
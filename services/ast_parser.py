@@ -1,69 +1,542 @@
 import ast
+import bisect
+import difflib
+import hashlib
 import inspect
+import re
+import textwrap
+
+
+class FunctionInfo:
+    """
+    Compact record for one parsed function.
+    
+    Only names, flags and line/offset bookkeeping are stored; the source text is
+    shared with every other record from the same parse, and the dedented
+    source, docstring and AST node are rebuilt on access instead of being kept
+    alive. Records support the read-only mapping interface of the dicts that
+    parse_functions used to return (func["name"], func.get("node"), ...).
+    """
+
+    __slots__ = (
+        "name", "qualname", "args", "has_docstring", "line_number", "end_line_number",
+        "class_name", "original_indent", "_code", "_start", "_end", "_node_start",
+    )
+
+    _FIELDS = (
+        "name", "qualname", "args", "has_docstring", "docstring", "source_code",
+        "line_number", "end_line_number", "class_name", "is_method", "node", "original_indent",
+    )
+
+    def __init__(self, code: str, start: int, end: int, name: str, qualname: str, args: tuple,
+                 has_docstring: bool, line_number: int, end_line_number: int,
+                 class_name: str = None, original_indent: int = 0, node_start: int = None):
+        self._code = code
+        self._start = start
+        self._end = end
+        # Offset of the first decorator line (the def line when undecorated)
+        self._node_start = start if node_start is None else node_start
+        self.name = name
+        self.qualname = qualname
+        self.args = args
+        self.has_docstring = has_docstring
+        self.line_number = line_number
+        self.end_line_number = end_line_number
+        self.class_name = class_name
+        self.original_indent = original_indent
+
+    @property
+    def is_method(self) -> bool:
+        return self.class_name is not None
+
+    @property
+    def source_code(self) -> str:
+        """The function source (def line to last line), dedented by its own indentation."""
+        return self._dedented(self._start)
+
+    @property
+    def node(self):
+        """
+        A freshly parsed AST node for the function (not cached, so it is not kept alive).
+
+        The node includes its decorators, and its line numbers refer to the whole module.
+        """
+        try:
+            node = ast.parse(self._dedented(self._node_start)).body[0]
+            decorator_lines = self._code.count('\n', self._node_start, self._start)
+            ast.increment_lineno(node, self.line_number - decorator_lines - 1)
+            return node
+        except SyntaxError:
+            # Lines indented less than the def (e.g. in multi-line strings) do not
+            # survive dedenting; find the node in the whole module instead
+            return build_qualname_index(ast.parse(self._code))[self.qualname]["node"]
+
+    def _dedented(self, start: int) -> str:
+        indent = self.original_indent
+        return '\n'.join(
+            (line[indent:] if not line[:indent].strip() else line.lstrip()) if line.strip() else ''
+            for line in self._code[start:self._end].splitlines()
+        )
+
+    @property
+    def docstring(self) -> str:
+        if not self.has_docstring:
+            return ""
+        return ast.get_docstring(self.node) or ""
+
+    def __getitem__(self, key):
+        if key not in self._FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._FIELDS
+
+    def get(self, key, default=None):
+        return self[key] if key in self._FIELDS else default
+
+    def keys(self) -> tuple:
+        return self._FIELDS
+
+    def copy(self) -> dict:
+        """Return a plain dict of every field except the AST node."""
+        return {key: self[key] for key in self._FIELDS if key != "node"}
+
+    def __repr__(self) -> str:
+        return f"FunctionInfo({self.qualname!r}, line {self.line_number})"
+
 
 def parse_functions(code: str):
     """
     Parse Python code and extract functions and class methods.
     
-    Returns list of function info dicts with:
+    Functions are found at any depth (nested classes, inner functions, and
+    definitions inside if/try blocks) via the qualified-name index.
+    
+    Returns list of FunctionInfo records with:
     - name: function name
-    - args: list of argument names
+    - qualname: qualified name, e.g. "Outer.Inner.method" or "func.<locals>.helper"
+    - args: tuple of argument names
     - has_docstring: whether function has a docstring
     - docstring: the existing docstring (if any)
-    - source_lines: the function source code
+    - source_code: the dedented function source code
     - line_number: starting line number
-    - class_name: (optional) parent class name if this is a method
+    - end_line_number: last line number
+    - class_name: qualified name of the parent class if this is a method, else None
     - is_method: whether this is a class method
+    - node: the function's AST node (parsed on access)
+    - original_indent: indentation of the def line
+    """
+    return _records_from_tree(code, ast.parse(code), _line_starts(code))
+
+
+def reparse_functions(old_code: str, old_functions: list, new_code: str):
+    """
+    Parse an edited version of code, re-parsing only the top-level blocks that changed.
+    
+    The two versions are diffed line by line. Each changed range is widened to
+    whole top-level statements (a line starting at column 0, together with its
+    decorators and else/except/finally clauses) and only those regions are
+    parsed. Records for functions in untouched blocks are reused with their
+    line numbers shifted. Whenever a region cannot be parsed on its own, or
+    duplicate names would need renumbering, the whole text is parsed instead,
+    so the result always equals parse_functions(new_code).
+    
+    Args:
+        old_code: The previously parsed code
+        old_functions: The records parse_functions returned for old_code
+        new_code: The edited code
+    
+    Returns:
+        List of FunctionInfo records for new_code, in source order
+    
+    Raises:
+        SyntaxError: If new_code is not valid Python
     """
-    tree = ast.parse(code)
+    old_lines = _split_lines(old_code)
+    new_lines = _split_lines(new_code)
+    if not new_lines:
+        return parse_functions(new_code)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+    
+    # Line number shift for every old line that survives unchanged
+    shifts = {}
+    changed = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for i in range(i1, i2):
+                shifts[i + 1] = j1 - i1
+        else:
+            if _may_retokenize(old_lines[i1:i2], new_lines[j1:j2]):
+                return parse_functions(new_code)
+            changed.append((j1, j2))
+    
+    regions = _changed_regions(new_lines, changed)
+    line_starts = _line_starts(new_code)
+    
     functions = []
-    lines = code.splitlines()
-
-    def extract_function_info(node, class_name=None, depth=0):
-        """Recursively extract function information."""
-        if isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-            has_docstring = ast.get_docstring(node) is not None
-            docstring = ast.get_docstring(node) or ""
-            
-            # Get function source lines
-            start_line = node.lineno - 1
-            end_line = node.end_lineno if hasattr(node, 'end_lineno') else len(lines)
-            source_lines = lines[start_line:end_line]
-            
-            # Calculate indentation from first line
-            first_line = source_lines[0]
-            indent = len(first_line) - len(first_line.lstrip())
-            
-            # Dedent source code
-            dedented_lines = []
-            for line in source_lines:
-                if line.strip():
-                    dedented_lines.append(line[indent:])
-                else:
-                    dedented_lines.append('')
-            
-            source_code = '\n'.join(dedented_lines)
-            
-            functions.append({
-                "name": node.name,
-                "args": [arg.arg for arg in node.args.args],
-                "has_docstring": has_docstring,
-                "docstring": docstring,
-                "source_code": source_code,
-                "line_number": node.lineno,
-                "class_name": class_name,
-                "is_method": class_name is not None,
-                "node": node,
-                "original_indent": indent,
-            })
-
-        # Handle nested class methods
-        if isinstance(node, ast.ClassDef):
-            for item in node.body:
-                extract_function_info(item, class_name=node.name, depth=depth+1)
-
-    # First pass: get top-level functions and classes
-    for node in tree.body:
-        extract_function_info(node)
+    region_names = set()
+    for first, last in regions:
+        region_code = ''.join(new_lines[first:last])
+        try:
+            tree = ast.parse(region_code)
+        except SyntaxError:
+            return parse_functions(new_code)
+        ast.increment_lineno(tree, first)
+        index = build_qualname_index(tree)
+        names = {qualname.split('#')[0] for qualname in index if '.' not in qualname}
+        if names & region_names:
+            return parse_functions(new_code)
+        region_names |= names
+        functions.extend(_records_from_tree(new_code, tree, line_starts, index))
+    
+    for func in old_functions:
+        shift = shifts.get(func.line_number)
+        if shift is None or shifts.get(func.end_line_number) != shift:
+            continue
+        line = func.line_number + shift
+        if any(first < line <= last for first, last in regions):
+            continue
+        if func.qualname.split('.')[0] in region_names:
+            # A re-parsed definition with the same name changes this one's "#2" numbering
+            return parse_functions(new_code)
+        decorator_lines = func._code.count('\n', func._node_start, func._start)
+        functions.append(FunctionInfo(
+            new_code,
+            line_starts[line - 1],
+            line_starts[func.end_line_number + shift],
+            name=func.name,
+            qualname=func.qualname,
+            args=func.args,
+            has_docstring=func.has_docstring,
+            line_number=line,
+            end_line_number=func.end_line_number + shift,
+            class_name=func.class_name,
+            original_indent=func.original_indent,
+            node_start=line_starts[line - 1 - decorator_lines],
+        ))
+    
+    functions.sort(key=lambda func: func.line_number)
+    
+    # "#2" suffixes depend on definitions elsewhere in the module
+    qualnames = [func.qualname for func in functions]
+    if len(set(qualnames)) != len(qualnames) or any('#' in name for name in qualnames):
+        return parse_functions(new_code)
+    return functions
+
+
+def _bracket_depth(lines: list) -> int:
+    """Return how many more brackets the lines open than they close (strings and comments included)."""
+    text = ''.join(lines)
+    return sum(text.count(bracket) for bracket in '([{') - sum(text.count(bracket) for bracket in ')]}')
+
+
+def _may_retokenize(old_lines: list, new_lines: list) -> bool:
+    """
+    Check whether replacing old_lines with new_lines could change how untouched lines are read.
+    
+    Triple-quoted strings, backslash continuations and unbalanced brackets can
+    carry a token across top-level block boundaries, so such edits are not
+    safe to re-parse region by region.
+    """
+    for line in old_lines + new_lines:
+        if '"""' in line or "'''" in line or line.rstrip('\r\n').endswith('\\'):
+            return True
+    return _bracket_depth(old_lines) != _bracket_depth(new_lines)
+
+
+# Column-0 lines that continue the previous top-level statement
+_CONTINUATION_PREFIXES = ('elif', 'else', 'except', 'finally', ')', ']', '}')
+
+
+def _changed_regions(lines: list, changed: list) -> list:
+    """Widen changed [start, end) line ranges to whole top-level blocks and merge them."""
+    starts = [0]
+    for i, line in enumerate(lines):
+        if i == 0 or not line[:1].strip() or line.startswith(('#',) + _CONTINUATION_PREFIXES):
+            continue
+        previous = i - 1
+        while previous > 0 and not lines[previous].strip():
+            previous -= 1
+        if not lines[previous].startswith('@'):
+            starts.append(i)
+    starts.append(len(lines))
+    
+    regions = []
+    for j1, j2 in changed:
+        # Include the neighbouring lines: text inserted or deleted at a block
+        # boundary can belong to the block before it
+        low = max(j1 - 1, 0)
+        high = min(max(j2, j1) + 1, len(lines))
+        first = starts[bisect.bisect_right(starts, low) - 1]
+        last = starts[bisect.bisect_right(starts, high - 1)]
+        if regions and first <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], max(last, regions[-1][1]))
+        else:
+            regions.append((first, last))
+    return regions
+
+
+def _split_lines(code: str) -> list:
+    """Split code into lines (keeping line endings) exactly where the parser counts them."""
+    return re.findall(r'[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$', code)
 
+
+def _line_starts(code: str) -> list:
+    """Return the offset of the start of each line, plus the length of the code."""
+    line_starts = [0]
+    for line in _split_lines(code):
+        line_starts.append(line_starts[-1] + len(line))
+    return line_starts
+
+
+def _records_from_tree(code: str, tree, line_starts: list, index: dict = None) -> list:
+    """Build FunctionInfo records for every function in a tree whose line numbers refer to `code`."""
+    functions = []
+    for qualname, entry in (index or build_qualname_index(tree)).items():
+        if entry["kind"] != "function":
+            continue
+        node = entry["node"]
+        first_stmt = node.body[0]
+        has_docstring = (
+            isinstance(first_stmt, ast.Expr)
+            and isinstance(first_stmt.value, ast.Constant)
+            and isinstance(first_stmt.value.value, str)
+        )
+        
+        start = line_starts[node.lineno - 1]
+        end = line_starts[node.end_lineno]
+        first_line = code[start:line_starts[node.lineno]]
+        
+        functions.append(FunctionInfo(
+            code,
+            start,
+            end,
+            name=node.name,
+            qualname=qualname,
+            args=tuple(arg.arg for arg in node.args.args),
+            has_docstring=has_docstring,
+            line_number=node.lineno,
+            end_line_number=node.end_lineno,
+            class_name=entry["class_name"],
+            original_indent=len(first_line) - len(first_line.lstrip()),
+            node_start=line_starts[entry["start_line"] - 1],
+        ))
     return functions
+
+
+def build_qualname_index(tree) -> dict:
+    """
+    Index every function and class in a module by qualified name.
+    
+    Names follow Python's __qualname__ ("Outer.Inner.method",
+    "func.<locals>.helper"). When a name is defined more than once in the same
+    scope (redefinitions, overloads, property setters), the first definition
+    keeps the plain name and later ones get "#2", "#3", ... suffixes so every
+    node stays addressable.
+    
+    Args:
+        tree: Parsed module (ast.Module)
+    
+    Returns:
+        Dict in source order mapping qualname to a dict with:
+        - node: the FunctionDef/AsyncFunctionDef/ClassDef node
+        - kind: "function" or "class"
+        - class_name: qualname of the directly enclosing class (functions only), else None
+        - start_line: first line, including decorators
+        - end_line: last line
+    """
+    index = {}
+
+    def visit(statements, prefix, class_name):
+        for node in statements:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                qualname = prefix + node.name
+                if qualname in index:
+                    suffix = 2
+                    while f"{qualname}#{suffix}" in index:
+                        suffix += 1
+                    qualname = f"{qualname}#{suffix}"
+                
+                is_class = isinstance(node, ast.ClassDef)
+                index[qualname] = {
+                    "node": node,
+                    "kind": "class" if is_class else "function",
+                    "class_name": None if is_class else class_name,
+                    "start_line": min([node.lineno] + [d.lineno for d in node.decorator_list]),
+                    "end_line": node.end_lineno,
+                }
+                if is_class:
+                    visit(node.body, qualname + ".", qualname)
+                else:
+                    visit(node.body, qualname + ".<locals>.", None)
+            else:
+                # Definitions inside if/for/while/try/with/match blocks share the enclosing scope
+                visit(_child_statements(node), prefix, class_name)
+
+    visit(tree.body, "", None)
+    return index
+
+
+def _child_statements(node) -> list:
+    """Return the statements directly nested in a compound statement's blocks, in source order."""
+    statements = []
+    block = getattr(node, "body", None)
+    if isinstance(block, list):
+        statements.extend(block)
+    # try: body, except handlers, else, finally
+    for handler in getattr(node, "handlers", []):
+        statements.extend(handler.body)
+    for field in ("orelse", "finalbody"):
+        statements.extend(getattr(node, field, None) or [])
+    for case in getattr(node, "cases", []):
+        statements.extend(case.body)
+    return statements
+
+
+def function_identity(func: dict) -> str:
+    """Return a stable identifier for a parsed function, e.g. "MyClass.method"."""
+    if func.get("qualname"):
+        return func["qualname"]
+    if func.get("class_name"):
+        return f"{func['class_name']}.{func['name']}"
+    return func["name"]
+
+
+def unchanged_functions(old_functions: list, new_functions: list) -> dict:
+    """
+    Find the functions that survived an edit unchanged.
+    
+    A function is unchanged when a function with the same identity existed
+    before and its source fingerprint is identical, so results computed for
+    the old version still apply.
+    
+    Returns:
+        Dict mapping function identity to the new record
+    """
+    old_fingerprints = {
+        function_identity(func): source_fingerprint(func["source_code"]) for func in old_functions
+    }
+    return {
+        function_identity(func): func
+        for func in new_functions
+        if old_fingerprints.get(function_identity(func)) == source_fingerprint(func["source_code"])
+    }
+
+
+def source_fingerprint(source_code: str) -> str:
+    """
+    Compute a stable content hash for a function's source code.
+    
+    The source is dedented and normalized (line endings, trailing whitespace,
+    surrounding blank lines) so cosmetic differences do not change the hash.
+    
+    Returns:
+        Hex SHA-256 digest of the normalized source
+    """
+    lines = textwrap.dedent(source_code.replace("\r\n", "\n")).splitlines()
+    normalized = "\n".join(line.rstrip() for line in lines).strip("\n")
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# Decorators whose function is read as an attribute, so its summary describes the value
+_PROPERTY_DECORATORS = ("property", "cached_property")
+
+
+def summarize_function(node) -> dict:
+    """
+    Summarize a function's signature and behaviour from its AST node.
+    
+    Nested functions, classes and lambdas are skipped, so their returns, yields
+    and raises are not attributed to the outer function.
+    
+    Returns dict with:
+    - params: list of {"name", "annotation", "default", "kind"} (self/cls excluded)
+    - return_annotation: the return annotation source (or None)
+    - returns_value: whether any return statement returns a value
+    - yields: whether the function is a generator
+    - raises: exception names raised directly in the body (in order, de-duplicated)
+    - is_async: whether the function is a coroutine
+    - is_property: whether the function is a property (or cached_property) getter
+    """
+    args = node.args
+    params = []
+    
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    for arg, default in zip(positional, defaults):
+        params.append(_param_info(arg, default, "positional"))
+    if args.vararg:
+        params.append(_param_info(args.vararg, None, "var_positional"))
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        params.append(_param_info(arg, default, "keyword_only"))
+    if args.kwarg:
+        params.append(_param_info(args.kwarg, None, "var_keyword"))
+    
+    # Drop the implicit receiver of methods
+    if params and params[0]["name"] in ("self", "cls") and params[0]["kind"] == "positional":
+        params.pop(0)
+    
+    returns_value = False
+    yields = False
+    raises = []
+    # Depth-first walk in source order
+    pending = list(reversed(node.body))
+    while pending:
+        child = pending.pop()
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(child, ast.Return) and child.value is not None:
+            if not (isinstance(child.value, ast.Constant) and child.value.value is None):
+                returns_value = True
+        elif isinstance(child, (ast.Yield, ast.YieldFrom)):
+            yields = True
+        elif isinstance(child, ast.Raise) and child.exc is not None:
+            exc = child.exc.func if isinstance(child.exc, ast.Call) else child.exc
+            name = ast.unparse(exc)
+            if name not in raises:
+                raises.append(name)
+        pending.extend(reversed(list(ast.iter_child_nodes(child))))
+    
+    return {
+        "params": params,
+        "return_annotation": ast.unparse(node.returns) if node.returns else None,
+        "returns_value": returns_value,
+        "yields": yields,
+        "raises": raises,
+        "is_async": isinstance(node, ast.AsyncFunctionDef),
+        "is_property": any(
+            ast.unparse(decorator).rsplit(".", 1)[-1] in _PROPERTY_DECORATORS for decorator in node.decorator_list
+        ),
+    }
+
+
+def summarize_functions(code: str) -> dict:
+    """
+    Summarize every function of a module with a single parse.
+    
+    Args:
+        code: Python source code
+    
+    Returns:
+        Mapping of each function's qualified name (see build_qualname_index)
+        to its summarize_function result
+    
+    Raises:
+        SyntaxError: If the code cannot be parsed
+    """
+    return {
+        qualname: summarize_function(entry["node"])
+        for qualname, entry in build_qualname_index(ast.parse(code)).items()
+        if entry["kind"] == "function"
+    }
+
+
+def _param_info(arg, default, kind):
+    """Describe one parameter for summarize_function."""
+    return {
+        "name": arg.arg,
+        "annotation": ast.unparse(arg.annotation) if arg.annotation else None,
+        "default": ast.unparse(default) if default is not None else None,
+        "kind": kind,
+    }
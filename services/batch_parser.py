@@ -0,0 +1,182 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from services.ast_parser import parse_functions
+from services.coverage import generate_coverage_report
+from services.lru import LRUCache
+from services.result_store import file_fingerprint
+
+# Worker processes for parsing uploads (defaults to the number of CPUs)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+# Smaller batches are parsed in-process: starting work in the pool costs more than it saves
+PARALLEL_PARSE_MIN_FILES = int(os.getenv("PARALLEL_PARSE_MIN_FILES", "8"))
+# Parsed files remembered by content hash, so re-uploads skip parsing
+PARSE_CACHE_MAX_FILES = int(os.getenv("PARSE_CACHE_MAX_FILES", "256"))
+
+
+class ParseCache:
+    """
+    Process-wide LRU of parse results keyed by file content hash.
+
+    Results are deterministic for a given content, so a file uploaded again
+    (by any session) reuses its function table and coverage report. Syntax
+    errors are remembered too.
+    """
+
+    def __init__(self, max_entries: int = PARSE_CACHE_MAX_FILES):
+        self._entries = LRUCache(max_entries)
+
+    def get(self, file_hash: str):
+        """Return the cached (functions, report, error) for a content hash, or None."""
+        return self._entries.get(file_hash)
+
+    def put(self, file_hash: str, functions: list, report: dict, error: str):
+        self._entries.put(file_hash, (functions, report, error))
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of cached files."""
+        return self._entries.stats()
+
+
+_parse_cache = ParseCache()
+
+
+def get_parse_cache() -> ParseCache:
+    """Return the process-wide parse cache."""
+    return _parse_cache
+
+
+def parse_source(filename: str, code: str) -> dict:
+    """
+    Parse one file and build its coverage report.
+
+    Args:
+        filename: Name used to report the file
+        code: Decoded Python source
+
+    Returns:
+        Dict with "filename", "functions", "report", "parse_time" (seconds) and
+        "error" (None, or a message when the file could not be parsed)
+    """
+    started = time.perf_counter()
+    try:
+        functions = parse_functions(code)
+    except SyntaxError as e:
+        return {
+            "filename": filename,
+            "functions": [],
+            "report": None,
+            "parse_time": time.perf_counter() - started,
+            "error": f"Syntax Error: {e}",
+        }
+
+    return {
+        "filename": filename,
+        "functions": functions,
+        "report": generate_coverage_report(functions),
+        "parse_time": time.perf_counter() - started,
+        "error": None,
+    }
+
+
+def _parse_item(item) -> dict:
+    return parse_source(*item)
+
+
+def parse_sources(sources, max_workers: int = None, use_cache: bool = True) -> list:
+    """
+    Parse many files, spreading the work over a process pool.
+
+    Files whose content was parsed before are served from the parse cache;
+    only new or modified files are parsed. A file that fails to parse is
+    reported in its result instead of aborting the batch. Results are
+    picklable FunctionInfo records and plain dicts. Batches smaller than
+    PARALLEL_PARSE_MIN_FILES, or a single worker, are parsed in the calling
+    process.
+
+    Args:
+        sources: List of (filename, code) pairs
+        max_workers: Worker processes to use (defaults to PARSE_WORKERS)
+        use_cache: Set to False to parse every file again
+
+    Returns:
+        List of parse_source results, in the order of `sources`, each with an
+        added "file_hash" and "cached" (True when served from the cache)
+    """
+    sources = list(sources)
+    hashes = [file_fingerprint(code) for _, code in sources]
+    results = [None] * len(sources)
+
+    cache = get_parse_cache()
+    todo = []
+    for idx, ((filename, _), file_hash) in enumerate(zip(sources, hashes)):
+        entry = cache.get(file_hash) if use_cache else None
+        if entry is None:
+            todo.append(idx)
+            continue
+        functions, report, error = entry
+        results[idx] = {
+            "filename": filename,
+            "functions": list(functions),
+            "report": dict(report) if report else report,
+            "parse_time": 0.0,
+            "error": error,
+        }
+
+    parsed = _parse_uncached([sources[idx] for idx in todo], max_workers)
+    for idx, result in zip(todo, parsed):
+        cache.put(hashes[idx], result["functions"], result["report"], result["error"])
+        results[idx] = result
+
+    parsed_now = set(todo)
+    for idx, result in enumerate(results):
+        result["file_hash"] = hashes[idx]
+        result["cached"] = idx not in parsed_now
+    return results
+
+
+def _parse_uncached(sources: list, max_workers: int = None) -> list:
+    workers = min(max_workers or PARSE_WORKERS, len(sources))
+    if workers <= 1 or len(sources) < PARALLEL_PARSE_MIN_FILES:
+        return [parse_source(filename, code) for filename, code in sources]
+
+    # Several files per task keeps inter-process overhead low for small files
+    chunksize = max(1, len(sources) // (workers * 4))
+    try:
+        return list(_get_pool(workers).map(_parse_item, sources, chunksize=chunksize))
+    except BrokenProcessPool:
+        _reset_pool()
+        return [parse_source(filename, code) for filename, code in sources]
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared worker pool, (re)creating it when more workers are needed."""
+    global _pool, _pool_workers
+
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned workers: forking the multi-threaded Streamlit server is not safe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool():
+    global _pool, _pool_workers
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+        _pool_workers = 0
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from services.ast_parser import source_fingerprint
+
+CACHE_PATH = os.getenv("DOCSTRING_CACHE_PATH", ".docstring_cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.getenv("DOCSTRING_CACHE_MAX_ENTRIES", "10000"))
+
+
+def make_cache_key(source_code: str, style: str, model: str) -> str:
+    """
+    Build the cache key for a generated docstring.
+
+    Args:
+        source_code: The function source code
+        style: Docstring style (Google, NumPy, or reST)
+        model: Model signature that produced the docstring
+
+    Returns:
+        Hex digest identifying the (source, style, model) combination
+    """
+    material = f"{source_fingerprint(source_code)}\0{style}\0{model}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class DocstringCache:
+    """SQLite-backed docstring store with least-recently-used eviction."""
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # One connection shared by all threads; access is serialized by _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docstrings ("
+            " key TEXT PRIMARY KEY,"
+            " docstring TEXT NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON docstrings (last_access)")
+
+    def get(self, key: str):
+        """Return the cached docstring for `key`, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT docstring FROM docstrings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE docstrings SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, docstring: str):
+        """Store a docstring, evicting the least recently used entries beyond max_entries."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO docstrings (key, docstring, last_access) VALUES (?, ?, ?)",
+                (key, docstring, time.time()),
+            )
+            overflow = self._count() - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM docstrings WHERE key IN "
+                    "(SELECT key FROM docstrings ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+
+    def clear(self):
+        """Remove all cached docstrings and reset the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM docstrings")
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": self._count(),
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            }
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM docstrings").fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DocstringCache:
+    """Return the process-wide docstring cache, creating it on first use."""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = DocstringCache()
+            except sqlite3.Error:
+                # Unwritable location: keep caching for the lifetime of the process only
+                _cache = DocstringCache(path=":memory:")
+        return _cache
@@ -1,4 +1,10 @@
 import ast
+import io
+import re
+import tokenize
+
+from services.ast_parser import build_qualname_index
+
 
 def insert_docstring(code: str, function_name: str, new_docstring: str, class_name: str = None):
     """
@@ -8,97 +14,204 @@ def insert_docstring(code: str, function_name: str, new_docstring: str, class_na
         code: Original Python code
         function_name: Name of the function
         new_docstring: New docstring to insert
-        class_name: Optional class name if this is a method
+        class_name: Optional class name (or qualified class name) if this is a method
     
     Returns:
         Updated code with inserted docstring
     """
-    tree = ast.parse(code)
-    lines = code.splitlines(keepends=True)
-    
-    # Find the target function
-    target_func = None
-    target_class = None
-    
-    for node in ast.walk(tree):
-        if isinstance(node, ast.ClassDef) and class_name and node.name == class_name:
-            target_class = node
-            for item in node.body:
-                if isinstance(item, ast.FunctionDef) and item.name == function_name:
-                    target_func = item
-                    break
-        elif isinstance(node, ast.FunctionDef) and node.name == function_name and not class_name:
-            target_func = node
-            break
-    
-    if not target_func:
-        return code
-    
-    # Get the indentation of the function
-    func_line = target_func.lineno - 1
-    func_indent = len(lines[func_line]) - len(lines[func_line].lstrip())
-    indent_str = ' ' * (func_indent + 4)
+    identifier = f"{class_name}.{function_name}" if class_name else function_name
+    return apply_all_docstrings(code, {identifier: new_docstring})
+
+
+def format_docstring_literal(new_docstring: str, indent_str: str, newline: str = '\n') -> str:
+    """
+    Render a docstring as a string literal whose continuation lines sit at `indent_str`.
     
-    # Format the docstring
+    Raises:
+        ValueError: If the docstring is empty or whitespace only
+    """
     docstring_lines = new_docstring.strip().splitlines()
-    formatted_docstring = '\n'.join(docstring_lines)
+    if not docstring_lines:
+        raise ValueError("Cannot render an empty docstring")
     
     # Create docstring with proper quotes
-    if '"""' in formatted_docstring:
+    if '"""' in new_docstring:
         quote = "'''"
     else:
         quote = '"""'
+    # Keep backslashes literal (PEP 257 D301)
+    prefix = 'r' if '\\' in new_docstring else ''
+    
+    body = (newline).join(
+        [docstring_lines[0]] + [indent_str + line if line.strip() else '' for line in docstring_lines[1:]]
+    )
     
     # Format docstring: closing quotes on separate line for multi-line docstrings (PEP 257 D209)
-    if '\n' in formatted_docstring:
-        # Multi-line: closing quotes on separate line
-        docstring_block = f'{indent_str}{quote}{formatted_docstring}\n{indent_str}{quote}\n'
-    else:
-        # Single-line: keep on same line
-        docstring_block = f'{indent_str}{quote}{formatted_docstring}{quote}\n'
-    
-    # Find where to insert the docstring (after the def line)
-    def_line = target_func.lineno - 1
-    
-    # Check if there's already a docstring
-    first_stmt = target_func.body[0] if target_func.body else None
-    has_docstring = isinstance(first_stmt, ast.Expr) and isinstance(first_stmt.value, ast.Constant) and isinstance(first_stmt.value.value, str)
-    
-    if has_docstring:
-        # Replace existing docstring
-        old_docstring_end = first_stmt.end_lineno
-        insert_pos = old_docstring_end
-        # Remove old docstring lines
-        del lines[first_stmt.lineno - 1:old_docstring_end]
-        # Insert new docstring
-        lines.insert(def_line + 1, docstring_block)
-    else:
-        # Insert new docstring after the def line
-        insert_pos = def_line + 1
-        lines.insert(insert_pos, docstring_block)
+    if len(docstring_lines) > 1:
+        return f'{prefix}{quote}{body}{newline}{indent_str}{quote}'
+    return f'{prefix}{quote}{body}{quote}'
+
+
+def _locate_targets(tree, identifiers) -> dict:
+    """
+    Resolve docstring identifiers to function nodes through the qualified-name index.
+    
+    An identifier is looked up as a qualified name first ("Outer.Inner.method",
+    "func.<locals>.helper"). Shorter forms such as "Inner.method" or "helper"
+    still resolve to the first function in source order whose qualified name
+    ends with them.
     
-    return ''.join(lines)
+    Returns:
+        Dict mapping each resolvable identifier to its function node
+    """
+    index = {
+        qualname: entry["node"]
+        for qualname, entry in build_qualname_index(tree).items()
+        if entry["kind"] == "function"
+    }
+    
+    aliases = {}
+    for qualname, node in index.items():
+        parts = qualname.split('.')
+        for i in range(1, len(parts)):
+            aliases.setdefault('.'.join(parts[i:]), node)
+    
+    targets = {}
+    for identifier in identifiers:
+        node = index.get(identifier) or aliases.get(identifier)
+        if node is not None:
+            targets[identifier] = node
+    return targets
 
 
 def apply_all_docstrings(code: str, docstrings: dict):
     """
     Apply multiple docstrings to a code string.
     
+    The code is parsed once to resolve the targets, then a single tokenize pass
+    finds where each target's body really starts: after signatures spanning
+    several lines, after trailing comments, and on one-line definitions such as
+    `def f(): return 1`, which are split onto separate lines. The body's own
+    indentation (spaces or tabs) is reused, and existing docstrings are
+    replaced token-exactly, so surrounding code and comments are untouched.
+    All edits are spliced into the source in one final pass.
+    
     Args:
         code: Original Python code
-        docstrings: Dict with keys like "function_name" or "ClassName.method_name"
-                   and values as the docstrings to insert
+        docstrings: Dict with qualified names like "function_name", "ClassName.method_name"
+                   or "func.<locals>.helper" as keys and the docstrings to insert as values;
+                   empty or whitespace-only docstrings are skipped
     
     Returns:
         Updated code with all docstrings inserted
     """
-    result = code
+    docstrings = {identifier: doc for identifier, doc in docstrings.items() if doc and doc.strip()}
+    if not docstrings:
+        return code
     
-    for func_identifier, docstring in docstrings.items():
-        if '.' in func_identifier:
-            class_name, function_name = func_identifier.rsplit('.', 1)
-            result = insert_docstring(result, function_name, docstring, class_name=class_name)
-        else:
-            result = insert_docstring(result, func_identifier, docstring)
+    tree = ast.parse(code)
+    lines = io.StringIO(code).readlines()
+    line_starts = [0]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line))
+    newline = '\r\n' if '\r\n' in code else '\n'
+    
+    def offset(row, col):
+        return line_starts[row - 1] + col
+    
+    # Targets keyed by the position of their `def`/`async` keyword; a later identifier for the same node wins
+    targets = {}
+    for identifier, node in _locate_targets(tree, docstrings).items():
+        line = lines[node.lineno - 1]
+        position = (node.lineno, _char_column(line, node.col_offset))
+        first_stmt = node.body[0]
+        docstring_end = None
+        if isinstance(first_stmt, ast.Expr) and isinstance(first_stmt.value, ast.Constant) and isinstance(first_stmt.value.value, str):
+            end_line = lines[first_stmt.end_lineno - 1]
+            docstring_end = offset(first_stmt.end_lineno, _char_column(end_line, first_stmt.end_col_offset))
+        targets[position] = {
+            "docstring": docstrings[identifier],
+            "def_indent": line[:len(line) - len(line.lstrip())],
+            "docstring_end": docstring_end,
+        }
+    
+    edits = []
+    one_liners = []
+    indent_unit = None
+    active = None
+    for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+        if tok.type == tokenize.INDENT and indent_unit is None:
+            indent_unit = tok.string
+        
+        if active is not None:
+            phase = active["phase"]
+            if phase == "header":
+                # The signature ends at the first ':' outside brackets (annotations and defaults may contain ':')
+                if tok.type == tokenize.OP and tok.string in "([{":
+                    active["depth"] += 1
+                elif tok.type == tokenize.OP and tok.string in ")]}":
+                    active["depth"] -= 1
+                elif tok.type == tokenize.OP and tok.string == ":" and active["depth"] == 0:
+                    active.update(phase="after_colon", colon_end=offset(*tok.end))
+                continue
+            if phase == "after_colon":
+                if tok.type == tokenize.NEWLINE:
+                    active.update(phase="block", body_line=tok.end[0] + 1)
+                elif tok.type != tokenize.COMMENT:
+                    # Body on the same line as the signature
+                    active["body_start"] = offset(*tok.start)
+                    one_liners.append(active)
+                    active = None
+                continue
+            if tok.type in (tokenize.NL, tokenize.COMMENT, tokenize.INDENT):
+                if tok.type == tokenize.INDENT:
+                    active["body_indent"] = tok.string
+                continue
+            
+            # First token of the body: the existing docstring, or the statement to insert before
+            indent = active["body_indent"]
+            literal = format_docstring_literal(active["docstring"], indent, newline)
+            if active["docstring_end"] is not None:
+                edits.append((offset(*tok.start), active["docstring_end"], literal))
+            else:
+                at = line_starts[active["body_line"] - 1]
+                edits.append((at, at, f"{indent}{literal}{newline}"))
+            active = None
+        
+        # The same token may start a nested target (e.g. an inner function as first statement)
+        if tok.type == tokenize.NAME and tok.start in targets:
+            active = targets.pop(tok.start)
+            active.update(phase="header", depth=0)
+        elif not targets and active is None:
+            break
     
-    return result
+    for target in one_liners:
+        unit = indent_unit or ('\t' if '\t' in target["def_indent"] else '    ')
+        indent = target["def_indent"] + unit
+        literal = format_docstring_literal(target["docstring"], indent, newline)
+        start = target["colon_end"]
+        if target["docstring_end"] is None:
+            edits.append((start, target["body_start"], f"{newline}{indent}{literal}{newline}{indent}"))
+            continue
+        # Replace the docstring; statements after a ';' move to their own line
+        rest = re.match(r'[ \t]*;[ \t]*(?=[^\s#])', code[target["docstring_end"]:])
+        if rest:
+            edits.append((start, target["docstring_end"] + rest.end(), f"{newline}{indent}{literal}{newline}{indent}"))
+        else:
+            edits.append((start, target["docstring_end"], f"{newline}{indent}{literal}"))
+    
+    pieces = []
+    position = 0
+    for start, end, replacement in sorted(edits):
+        pieces.append(code[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(code[position:])
+    return ''.join(pieces)
+
+
+def _char_column(line: str, byte_offset: int) -> int:
+    """Convert an AST column (UTF-8 byte offset) into a character offset within `line`."""
+    if line.isascii():
+        return byte_offset
+    return len(line.encode('utf-8')[:byte_offset].decode('utf-8', errors='ignore'))
@@ -1,26 +1,32 @@
+from services.ast_parser import function_identity
+
+
 def generate_coverage_report(functions, approved_docstrings=None):
     """
     Generate a comprehensive documentation coverage report.
     
     Args:
         functions: List of function dicts from ast_parser
-        approved_docstrings: Optional dict of approved docstrings for coverage after processing
+        approved_docstrings: Optional dict of approved docstrings keyed by qualified name
     
     Returns:
         Dict with coverage metrics
     """
     approved_docstrings = approved_docstrings or {}
     
+    def is_approved(f):
+        return function_identity(f) in approved_docstrings or bool(f.get('approved_docstring'))
+    
     total = len(functions)
     
     # Count initially documented functions
     documented = sum(1 for f in functions if f.get("has_docstring"))
     
     # Count functions with approved docstrings
-    approved_count = sum(1 for f in functions if f['name'] in approved_docstrings or f.get('approved_docstring'))
+    approved_count = sum(1 for f in functions if is_approved(f))
     
     # Final count combines existing + newly approved
-    final_documented = sum(1 for f in functions if f.get("has_docstring") or f['name'] in approved_docstrings or f.get('approved_docstring'))
+    final_documented = sum(1 for f in functions if f.get("has_docstring") or is_approved(f))
     
     missing_initial = total - documented
     missing_final = total - final_documented
@@ -39,6 +45,6 @@ def generate_coverage_report(functions, approved_docstrings=None):
         "coverage_initial": round(coverage_initial, 2),
         "coverage_final": round(coverage_final, 2),
         "improvement": round(improvement, 2),
-        "missing_functions": [f["name"] for f in functions if not f["has_docstring"]],
-        "already_documented": [f["name"] for f in functions if f["has_docstring"]],
+        "missing_functions": [function_identity(f) for f in functions if not f["has_docstring"]],
+        "already_documented": [function_identity(f) for f in functions if f["has_docstring"]],
     }
@@ -1,4 +1,73 @@
-from services.api_manager import generate_with_fallback
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from services.api_manager import (
+    MODEL_SIGNATURE,
+    generate_with_provider,
+    max_concurrency,
+    stream_with_provider,
+)
+from services.cache import get_cache, make_cache_key
+from services.local_engine import synthesize_docstring
+from services.prompt_builder import DEFAULT_TOKEN_BUDGET, build_function_excerpt, estimate_tokens
+
+STYLE_GUIDES = {
+    "Google": """
+Use Google style docstring format:
+- One line summary (imperative mood)
+- Blank line
+- Longer description if needed
+- Args section with each parameter
+- Returns section
+- Raises section if applicable
+""",
+    "NumPy": """
+Use NumPy style docstring format:
+- One line summary
+- Extended summary
+- Parameters section with types
+- Returns section with types
+- Raises section if applicable
+""",
+    "reST": """
+Use reStructuredText format:
+- One line summary
+- Extended summary
+- :param name: description
+- :returns: description
+- :raises: exception names
+"""
+}
+
+# Batched mode: how much function source to pack into one prompt
+BATCH_TOKEN_BUDGET = 3000
+BATCH_MAX_FUNCTIONS = 20
+
+_BATCH_ENTRY_PATTERN = re.compile(
+    r"^=== FUNCTION (\d+) ===[ \t]*\n(.*?)\n=== END FUNCTION \1 ===",
+    re.DOTALL | re.MULTILINE,
+)
+
+
+# Providers whose answers come from an LLM, as reported by generate_docstring_with_provider
+LLM_PROVIDERS = ("google", "openai", "cache")
+
+
+class GenerationError(RuntimeError):
+    """Raised (or yielded) when no provider could generate a docstring."""
+
+
+class TemplateFallbackError(GenerationError):
+    """
+    Yielded when every LLM provider failed and the offline template engine answered.
+
+    The template docstring is kept in `docstring` so callers can still show it,
+    but it must not be stored or journaled as LLM output.
+    """
+
+    def __init__(self, docstring: str):
+        super().__init__("Every LLM provider failed; the offline template engine answered instead")
+        self.docstring = docstring
 
 def format_docstring_pep257(docstring: str) -> str:
     """
@@ -59,57 +128,373 @@ def format_docstring_pep257(docstring: str) -> str:
     
     return '\n'.join(content_lines)
 
-def generate_docstring(function_code: str, function_name: str = "", args: list = None, style: str = "Google"):
+def _build_prompt(function_code: str, args: list, style: str) -> str:
+    """Build the prompt for a single function."""
+    args_desc = f"with parameters: {', '.join(args)}" if args else ""
+    
+    return f"""Generate a concise, professional {style} style Python docstring following PEP 257 for this function {args_desc}:
+
+{function_code}
+
+{STYLE_GUIDES.get(style, '')}
+
+Return ONLY the docstring, without code formatting or extra text."""
+
+
+def _build_batch_prompt(entries: list, style: str) -> str:
+    """
+    Build one prompt covering several functions.
+    
+    Args:
+        entries: List of (entry_id, function_code, args) tuples
+        style: Docstring style (Google, NumPy, or reST)
+    
+    Returns:
+        Prompt asking for one delimited docstring block per entry id
+    """
+    sections = []
+    for entry_id, function_code, args in entries:
+        params = f"\n(parameters: {', '.join(args)})" if args else ""
+        sections.append(f"=== FUNCTION {entry_id} ===\n{function_code}{params}")
+    
+    return f"""Generate a concise, professional {style} style Python docstring following PEP 257 for each function below.
+
+{STYLE_GUIDES.get(style, '')}
+
+Each function starts with a line "=== FUNCTION <id> ===". Reply with one block per function in exactly this format, and nothing else:
+
+=== FUNCTION <id> ===
+<the docstring only, without quotes or code formatting>
+=== END FUNCTION <id> ===
+
+""" + "\n\n".join(sections)
+
+
+def _parse_batch_response(text: str) -> dict:
+    """Map entry ids to docstrings from a batched response; malformed blocks are skipped."""
+    parsed = {}
+    for match in _BATCH_ENTRY_PATTERN.finditer(text):
+        docstring = match.group(2).strip()
+        if docstring:
+            parsed[int(match.group(1))] = docstring
+    return parsed
+
+
+def _pack_batches(functions: list, token_budget: int = BATCH_TOKEN_BUDGET) -> list:
+    """
+    Group function indices so each group's source fits within a token budget.
+    
+    Functions larger than the budget get a batch of their own. Oversized
+    functions are counted at the prompt token budget they will be trimmed to.
+    
+    Returns:
+        List of index lists, preserving the input order
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for idx, func in enumerate(functions):
+        tokens = min(estimate_tokens(func["source_code"]), DEFAULT_TOKEN_BUDGET)
+        if current and (current_tokens + tokens > token_budget or len(current) >= BATCH_MAX_FUNCTIONS):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(idx)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _request_docstring(prompt: str, local_fallback=None):
+    """
+    Send a single-function prompt and return (docstring, provider).
+    
+    Only answers from an LLM provider are cacheable: provider errors (provider
+    None) and local-engine fallbacks must not be served from the cache once the
+    providers recover.
+    """
+    raw_docstring, provider = generate_with_provider(prompt, local_fallback=local_fallback)
+    # Format docstring to comply with PEP 257 D209
+    return format_docstring_pep257(raw_docstring), provider
+
+
+def _prompt_node(func):
+    """Return a function's AST node if its prompt will be trimmed, else None (records parse it on access)."""
+    if estimate_tokens(func["source_code"]) > DEFAULT_TOKEN_BUDGET:
+        return func.get("node")
+    return None
+
+
+def _local_fallback(function_code: str, style: str, node=None):
+    """Return a callable that synthesizes the docstring with the offline template engine."""
+    return lambda: synthesize_docstring(function_code, style=style, node=node)
+
+
+def generate_docstring(function_code: str, function_name: str = "", args: list = None, style: str = "Google",
+                       use_cache: bool = True, node=None, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                       engine: str = "llm"):
     """
     Generate a docstring for a given function using LLM.
     
+    Results are looked up in the on-disk docstring cache first, so unchanged
+    source with the same style and model never pays for a second LLM call.
+    When every provider fails, the offline template engine answers instead.
+    
     Args:
         function_code: The function source code
         function_name: Optional function name for context
         args: Optional list of argument names
         style: Docstring style (Google, NumPy, or reST)
+        use_cache: Set to False to bypass the cache and always call the LLM
+        node: Optional AST node of the function, used to trim oversized bodies
+        token_budget: Maximum estimated tokens of function code in the prompt
+        engine: "llm" (default) or "local" to skip the LLM and use the template engine
     
     Returns:
         Generated docstring string
     """
-    args_desc = f"with parameters: {', '.join(args)}" if args else ""
+    docstring, _ = generate_docstring_with_provider(
+        function_code, function_name=function_name, args=args, style=style, use_cache=use_cache,
+        node=node, token_budget=token_budget, engine=engine,
+    )
+    return docstring
+
+
+def generate_docstring_with_provider(function_code: str, function_name: str = "", args: list = None,
+                                     style: str = "Google", use_cache: bool = True, node=None,
+                                     token_budget: int = DEFAULT_TOKEN_BUDGET, engine: str = "llm") -> tuple:
+    """
+    Generate a docstring like generate_docstring, also reporting where it came from.
     
-    style_guide = {
-        "Google": """
-Use Google style docstring format:
-- One line summary (imperative mood)
-- Blank line
-- Longer description if needed
-- Args section with each parameter
-- Returns section
-- Raises section if applicable
-""",
-        "NumPy": """
-Use NumPy style docstring format:
-- One line summary
-- Extended summary
-- Parameters section with types
-- Returns section with types
-- Raises section if applicable
-""",
-        "reST": """
-Use reStructuredText format:
-- One line summary
-- Extended summary
-- :param name: description
-- :returns: description
-- :raises: exception names
-"""
-    }
+    Returns:
+        Tuple of (docstring, provider) where provider is "google" or "openai" for a
+        fresh LLM answer, "cache" for a cached one, "local" for the template engine
+        (selected, or as a fallback once every LLM provider failed), or None when
+        docstring is an "API Error: ..." message
+    """
+    if engine == "local":
+        return synthesize_docstring(function_code, style=style, node=node), "local"
+    
+    cache = get_cache() if use_cache else None
+    cache_key = make_cache_key(function_code, style, MODEL_SIGNATURE)
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached, "cache"
+    
+    excerpt = build_function_excerpt(function_code, node, token_budget)["code"]
+    docstring, provider = _request_docstring(
+        _build_prompt(excerpt, args, style), _local_fallback(function_code, style, node)
+    )
     
-    prompt = f"""Generate a concise, professional {style} style Python docstring following PEP 257 for this function {args_desc}:
+    # Never cache provider failures or template fallbacks
+    if cache and provider in LLM_PROVIDERS:
+        cache.put(cache_key, docstring)
+    
+    return docstring, provider
 
-{function_code}
 
-{style_guide.get(style, '')}
+def generate_docstring_stream(function_code: str, function_name: str = "", args: list = None, style: str = "Google",
+                              use_cache: bool = True, node=None, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                              engine: str = "llm"):
+    """
+    Generate a docstring like generate_docstring, yielding text as it streams in.
+    
+    A cache hit is yielded as a single chunk. The caller should pass the joined
+    chunks through format_docstring_pep257 to get the same result as
+    generate_docstring; the formatted docstring is cached once the stream ends.
+    
+    Args:
+        function_code: The function source code
+        function_name: Optional function name for context
+        args: Optional list of argument names
+        style: Docstring style (Google, NumPy, or reST)
+        use_cache: Set to False to bypass the cache and always call the LLM
+        node: Optional AST node of the function, used to trim oversized bodies
+        token_budget: Maximum estimated tokens of function code in the prompt
+        engine: "llm" (default) or "local" to skip the LLM and use the template engine
+    
+    Yields:
+        Raw docstring text chunks
+    """
+    for _, chunk in generate_docstring_stream_with_provider(
+        function_code, function_name=function_name, args=args, style=style, use_cache=use_cache,
+        node=node, token_budget=token_budget, engine=engine,
+    ):
+        yield chunk
 
-Return ONLY the docstring, without code formatting or extra text."""
+
+def generate_docstring_stream_with_provider(function_code: str, function_name: str = "", args: list = None,
+                                            style: str = "Google", use_cache: bool = True, node=None,
+                                            token_budget: int = DEFAULT_TOKEN_BUDGET, engine: str = "llm"):
+    """
+    Stream a docstring like generate_docstring_stream, yielding (provider, chunk) pairs.
     
-    raw_docstring = generate_with_fallback(prompt)
-    # Format docstring to comply with PEP 257 D209
-    return format_docstring_pep257(raw_docstring)
+    Providers are reported as by generate_docstring_with_provider; every chunk of
+    one docstring comes from the same provider.
+    """
+    if engine == "local":
+        yield "local", synthesize_docstring(function_code, style=style, node=node)
+        return
+    
+    cache = get_cache() if use_cache else None
+    cache_key = make_cache_key(function_code, style, MODEL_SIGNATURE)
+    if cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield "cache", cached
+            return
+    
+    excerpt = build_function_excerpt(function_code, node, token_budget)["code"]
+    chunks = []
+    providers = set()
+    for provider, chunk in stream_with_provider(
+        _build_prompt(excerpt, args, style), local_fallback=_local_fallback(function_code, style, node)
+    ):
+        providers.add(provider)
+        chunks.append(chunk)
+        yield provider, chunk
+    
+    raw_docstring = "".join(chunks)
+    # Only cache answers that came entirely from an LLM
+    if cache and providers and providers <= set(LLM_PROVIDERS):
+        cache.put(cache_key, format_docstring_pep257(raw_docstring))
+
+
+def generate_docstring_batch(functions: list, style: str = "Google", use_cache: bool = True) -> list:
+    """
+    Generate docstrings for several functions with a single LLM request.
+    
+    Cached functions are answered locally; the rest share one prompt. Any function
+    whose block is missing or malformed in the response falls back to its own
+    single-function request.
+    
+    Args:
+        functions: List of function dicts from ast_parser
+        style: Docstring style (Google, NumPy, or reST)
+        use_cache: Set to False to bypass the docstring cache
+    
+    Returns:
+        List of docstrings aligned with `functions`
+    """
+    return [docstring for docstring, _ in _generate_batch(functions, style, use_cache)]
+
+
+def _generate_batch(functions: list, style: str, use_cache: bool) -> list:
+    """Do the work of generate_docstring_batch, returning (docstring, provider) pairs."""
+    cache = get_cache() if use_cache else None
+    cache_keys = [make_cache_key(func["source_code"], style, MODEL_SIGNATURE) for func in functions]
+    results = [None] * len(functions)
+    
+    pending = []
+    for idx, cache_key in enumerate(cache_keys):
+        cached = cache.get(cache_key) if cache else None
+        if cached is not None:
+            results[idx] = (cached, "cache")
+        else:
+            pending.append(idx)
+    
+    excerpts = {
+        idx: build_function_excerpt(functions[idx]["source_code"], _prompt_node(functions[idx]))["code"]
+        for idx in pending
+    }
+    
+    parsed, batch_provider = {}, None
+    if len(pending) > 1:
+        prompt = _build_batch_prompt(
+            [(idx, excerpts[idx], functions[idx].get("args")) for idx in pending],
+            style,
+        )
+        raw_response, batch_provider = generate_with_provider(prompt)
+        if batch_provider is not None:
+            parsed = _parse_batch_response(raw_response)
+    
+    for idx in pending:
+        func = functions[idx]
+        if idx in parsed:
+            docstring, provider = format_docstring_pep257(parsed[idx]), batch_provider
+        else:
+            docstring, provider = _request_docstring(
+                _build_prompt(excerpts[idx], func.get("args"), style),
+                _local_fallback(func["source_code"], style, _prompt_node(func)),
+            )
+        
+        if cache and provider in LLM_PROVIDERS:
+            cache.put(cache_keys[idx], docstring)
+        results[idx] = (docstring, provider)
+    
+    return results
+
+
+def generate_docstrings_concurrently(functions: list, style: str = "Google", max_workers: int = None,
+                                     use_cache: bool = True, batched: bool = False,
+                                     token_budget: int = BATCH_TOKEN_BUDGET, engine: str = "llm"):
+    """
+    Generate docstrings for many functions using a bounded worker pool.
+    
+    Requests are fanned out over a thread pool sized to the providers' combined
+    concurrency limit, and results are yielded as soon as each one completes.
+    In batched mode, functions are packed into multi-function prompts of up to
+    `token_budget` tokens of source, cutting the number of LLM round-trips.
+    
+    Args:
+        functions: List of function dicts from ast_parser
+        style: Docstring style (Google, NumPy, or reST)
+        max_workers: Optional pool size (defaults to the providers' combined limit)
+        use_cache: Set to False to bypass the docstring cache
+        batched: Pack several functions into each request
+        token_budget: Source token budget per batched request
+        engine: "llm" (default) or "local" to use the offline template engine
+    
+    Yields:
+        Tuples of (index, docstring, error) in completion order, where index refers
+        to the position in `functions` and exactly one of docstring/error is set;
+        "API Error: ..." results are reported as a GenerationError, and template
+        docstrings standing in for a failed LLM as a TemplateFallbackError
+    """
+    if not functions:
+        return
+    
+    if batched and engine != "local":
+        units = _pack_batches(functions, token_budget)
+    else:
+        units = [[idx] for idx in range(len(functions))]
+    
+    def run_unit(indices):
+        if len(indices) == 1:
+            func = functions[indices[0]]
+            return [generate_docstring_with_provider(
+                func["source_code"],
+                function_name=func["name"],
+                args=func.get("args"),
+                style=style,
+                use_cache=use_cache,
+                # The template engine always needs the node; the LLM only to trim oversized functions
+                node=func.get("node") if engine == "local" else _prompt_node(func),
+                engine=engine,
+            )]
+        return _generate_batch([functions[idx] for idx in indices], style, use_cache)
+    
+    workers = min(max_workers or max_concurrency(), len(units))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docstring-gen")
+    
+    try:
+        futures = {executor.submit(run_unit, indices): indices for indices in units}
+        
+        for future in as_completed(futures):
+            indices = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                for idx in indices:
+                    yield idx, None, e
+                continue
+            for idx, (docstring, provider) in zip(indices, results):
+                if provider is None:
+                    yield idx, None, GenerationError(docstring)
+                elif provider == "local" and engine != "local":
+                    yield idx, None, TemplateFallbackError(docstring)
+                else:
+                    yield idx, docstring, None
+    finally:
+        # Drop queued work if the caller stops consuming early
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,597 @@
+import re
+from functools import lru_cache
+
+# Rule sets enabled unless a caller selects others: the PEP 257 groups
+DEFAULT_RULES = ("D1", "D2", "D3", "D4")
+
+# Third-person and non-imperative first words, with the imperative to suggest (D401)
+_IMPERATIVE_FORMS = {
+    "returns": "Return", "computes": "Compute", "calculates": "Calculate",
+    "determines": "Determine", "gets": "Get", "retrieves": "Retrieve",
+    "identifies": "Identify", "processes": "Process", "handles": "Handle",
+    "represents": "Represent", "defines": "Define", "performs": "Perform",
+    "executes": "Execute", "stores": "Store", "creates": "Create",
+    "generates": "Generate", "initializes": "Initialize", "sets": "Set",
+    "updates": "Update", "modifies": "Modify", "changes": "Change",
+    "converts": "Convert", "transforms": "Transform", "formats": "Format",
+    "parses": "Parse", "analyzes": "Analyze", "checks": "Check",
+    "validates": "Validate", "verifies": "Verify", "prints": "Print",
+    "displays": "Display", "shows": "Show", "outputs": "Output",
+    "reads": "Read", "writes": "Write", "opens": "Open", "closes": "Close",
+    "saves": "Save", "deletes": "Delete", "removes": "Remove", "sorts": "Sort",
+    "searches": "Search", "finds": "Find", "contains": "Include",
+    "has": "Have", "is": "Be", "are": "Be", "was": "Be", "were": "Be",
+    "being": "Be", "been": "Be",
+}
+
+# Section headers by lower-cased name, as each style spells them
+_GOOGLE_SECTIONS = {
+    name.lower(): name
+    for name in (
+        "Args", "Arguments", "Attention", "Attributes", "Caution", "Danger", "Error", "Example",
+        "Examples", "Hint", "Important", "Keyword Args", "Keyword Arguments", "Methods", "Note",
+        "Notes", "Other Parameters", "Parameters", "Return", "Returns", "Raise", "Raises",
+        "References", "See Also", "Tip", "Todo", "Warning", "Warnings", "Warns", "Yield", "Yields",
+    )
+}
+_NUMPY_SECTIONS = {
+    name.lower(): name
+    for name in (
+        "Short Summary", "Extended Summary", "Parameters", "Returns", "Yields", "Receives",
+        "Other Parameters", "Raises", "Warns", "Warnings", "See Also", "Notes", "References",
+        "Examples", "Attributes", "Methods",
+    )
+}
+_SECTION_NAMES = {**_GOOGLE_SECTIONS, **_NUMPY_SECTIONS}
+
+_LONGEST_SECTION = max(len(name) for name in _SECTION_NAMES) + 1
+
+# Sections (by canonical name) and reST fields that document each part of a signature
+_PARAM_SECTIONS = frozenset(("args", "arguments", "parameters", "keyword args", "keyword arguments", "other parameters"))
+_RETURN_SECTIONS = frozenset(("returns", "return"))
+_YIELD_SECTIONS = frozenset(("yields", "yield"))
+_RAISE_SECTIONS = frozenset(("raises", "raise"))
+_PARAM_FIELDS = frozenset(("param", "parameter", "arg", "argument", "key", "keyword"))
+_RAISE_FIELDS = frozenset(("raises", "raise", "except", "exception"))
+
+_FIELD = re.compile(r":([A-Za-z_]+)([^:]*):(.*)")
+_GOOGLE_ENTRY = re.compile(r"\*{0,2}([A-Za-z_][\w.]*)\s*(?:\(.*\))?\s*:")
+_NAME = re.compile(r"\*{0,2}([A-Za-z_][\w.]*)")
+_NUMPY_TYPE_SEPARATOR = re.compile(r"\s+:")
+_TAB_INDENT = re.compile(r"^ *\t", re.MULTILINE)
+_UNDERLINE = re.compile(r"-+")
+_PUNCTUATION = ".,:;!?"
+
+# (code, rule set, check) per registered rule; checks return None, a message or a list of messages
+_RULES = []
+
+
+def rule(code: str, rule_set: str = None):
+    """
+    Register a check under an error code.
+
+    Args:
+        code: pydocstyle-style error code, e.g. "D400"
+        rule_set: Name used to select the rule; defaults to the code's group ("D4").
+            Rules of a named set (e.g. "google") are only run when that set is selected
+
+    Returns:
+        Decorator that registers the check and returns it unchanged
+    """
+    def register(check):
+        _RULES.append((code, rule_set or code[:2], check))
+        return check
+    return register
+
+
+def rule_codes(rules: tuple = None) -> frozenset:
+    """Return the codes of every registered rule, or only of those a selection runs."""
+    if rules is None:
+        return frozenset(code for code, _, _ in _RULES)
+    return frozenset(code for code, _ in _compile(tuple(rules)))
+
+
+def rules_for_style(style: str) -> tuple:
+    """Return the default rule sets plus the section checks of a docstring style (Google, NumPy, reST)."""
+    return DEFAULT_RULES + (style.lower(),) if style else DEFAULT_RULES
+
+
+def is_selected(code: str, rules) -> bool:
+    """Check whether an error code is enabled by a selection of codes and rule sets."""
+    return any(code.startswith(selector) for selector in rules)
+
+
+@lru_cache(maxsize=None)
+def _compile(rules: tuple) -> tuple:
+    """Resolve a selection into the (code, check) pairs to run, in code order."""
+    return tuple(
+        (code, check)
+        for code, rule_set, check in sorted(_RULES, key=lambda entry: entry[0])
+        if rule_set in rules or (rule_set == code[:2] and is_selected(code, rules))
+    )
+
+
+class DocstringScan:
+    """
+    Everything the rules need to know about a docstring, gathered once and shared by every rule.
+
+    Section headers and reST fields are found in a single pass over the
+    lines, made the first time a (style) rule asks for them.
+
+    Attributes:
+        text: The docstring as given
+        lines: Lines of the docstring with surrounding blank lines dropped
+        summary: The stripped first line
+        first_word: First word of the summary, without trailing punctuation
+        tab_indented: Whether any line is indented with a tab
+        sections: (index, written name, canonical lower-case name, has colon) per header line
+        fields: (index, field name, argument, text) per reST field line
+        signature: summarize_function() result of the documented function, if known
+    """
+
+    __slots__ = (
+        "text", "lines", "summary", "first_word", "tab_indented", "signature",
+        "_sections", "_fields", "_contents", "_documented",
+    )
+
+    def __init__(self, docstring: str, signature: dict = None):
+        self.text = docstring
+        self.signature = signature
+        body = docstring.strip()
+        if "\r" in body:
+            body = body.replace("\r\n", "\n").replace("\r", "\n")
+        self.lines = lines = body.split("\n")
+        self.summary = lines[0].strip()
+        words = self.summary.split(None, 1)
+        self.first_word = words[0].rstrip(_PUNCTUATION) if words else ""
+        self.tab_indented = "\t" in body and _TAB_INDENT.search(body) is not None
+        self._sections = None
+        self._fields = None
+        self._contents = None
+        self._documented = {}
+
+    @property
+    def sections(self) -> list:
+        if self._sections is None:
+            self._scan_structure()
+        return self._sections
+
+    @property
+    def fields(self) -> list:
+        if self._fields is None:
+            self._scan_structure()
+        return self._fields
+
+    def _scan_structure(self):
+        sections = self._sections = []
+        fields = self._fields = []
+        # Non-blank lines under each section header, parallel to `sections`
+        contents = self._contents = []
+        lines = self.lines
+        for index, line in enumerate(lines[1:], 1):
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if stripped[0] == ":":
+                match = _FIELD.fullmatch(stripped)
+                if match:
+                    fields.append((index, match.group(1), match.group(2).strip(), match.group(3).strip()))
+            elif len(stripped) <= _LONGEST_SECTION:
+                has_colon = stripped[-1] == ":"
+                name = stripped[:-1].rstrip() if has_colon else stripped
+                canonical = name.lower()
+                # Without a colon, only an underlined name or one starting a paragraph is a header
+                # (an entry such as a parameter called `args` is not)
+                if canonical in _SECTION_NAMES and (
+                    has_colon
+                    or not lines[index - 1].strip()
+                    or (index + 1 < len(lines) and _UNDERLINE.fullmatch(lines[index + 1].strip()))
+                ):
+                    sections.append((index, name, canonical, has_colon))
+                    contents.append([])
+                    continue
+            if contents:
+                contents[-1].append(line)
+
+    def section_content(self, position: int) -> list:
+        """Return the non-blank lines between the header at `position` in `sections` and the next header."""
+        if self._contents is None:
+            self._scan_structure()
+        return self._contents[position]
+
+
+    def documented(self, extract) -> dict:
+        """Return (and remember) what `extract` finds documented: params, returns, yields and raises."""
+        documented = self._documented.get(extract)
+        if documented is None:
+            documented = self._documented[extract] = extract(self)
+        return documented
+
+
+def check_docstring(
+    docstring: str, function_name: str = "temp_func", rules: tuple = DEFAULT_RULES, signature: dict = None
+) -> list:
+    """
+    Run the selected rules over a docstring.
+
+    Args:
+        docstring: Docstring text, without quotes
+        function_name: Name of the documented function
+        rules: Rule sets ("D1", "D4", "google", ...) or individual codes to run
+        signature: summarize_function() result for the function; enables the
+            style sets' checks of parameters, returns, yields and raises
+
+    Returns:
+        List of error strings with format "[ErrorCode] Message"
+    """
+    scan = DocstringScan(docstring, signature)
+    errors = []
+    for code, check in _compile(tuple(rules)):
+        result = check(scan, function_name)
+        if not result:
+            continue
+        if isinstance(result, str):
+            errors.append(f"[{code}] {result}")
+        else:
+            errors.extend(f"[{code}] {message}" for message in result)
+    return errors
+
+
+# PEP 257 rules
+
+@rule("D100")
+def _missing(scan, function_name):
+    if not scan.summary:
+        return "Missing docstring in public function"
+
+
+@rule("D205")
+def _blank_after_summary(scan, function_name):
+    if len(scan.lines) > 1 and scan.lines[1].strip():
+        return "1 blank line required between summary line and description."
+
+
+@rule("D206")
+def _tab_indentation(scan, function_name):
+    if scan.tab_indented:
+        return "Docstring should be indented with spaces, not tabs."
+
+
+@rule("D300")
+def _triple_double_quotes(scan, function_name):
+    # The inserter falls back to ''' when the text itself contains """
+    if '"""' in scan.text:
+        return 'Use """triple double quotes""" (the docstring contains """).'
+
+
+@rule("D400")
+def _ends_with_period(scan, function_name):
+    if scan.summary and not scan.summary.endswith("."):
+        return "First line should end with a period."
+
+
+@rule("D401")
+def _imperative_mood(scan, function_name):
+    imperative = _IMPERATIVE_FORMS.get(scan.first_word.lower())
+    if imperative:
+        return f"First line should be in imperative mood; change '{scan.first_word}' to '{imperative}'."
+
+
+@rule("D402")
+def _not_a_signature(scan, function_name):
+    if f"{function_name}(" in scan.summary:
+        return "First line should not be the function's signature."
+
+
+@rule("D403")
+def _capitalized(scan, function_name):
+    word = scan.first_word
+    if word.isalpha() and word.islower():
+        return f"First word of the first line should be properly capitalized ('{word.capitalize()}', not '{word}')."
+
+
+# Section rules, one set per docstring style
+
+def _misspelled_sections(scan, names: dict) -> list:
+    return [
+        f"Section name should be properly capitalized ('{names[canonical]}', not '{name}')."
+        for _, name, canonical, _ in scan.sections
+        if canonical in names and name != names[canonical]
+    ]
+
+
+def _crowded_sections(scan, names: dict) -> list:
+    return [
+        f"Missing blank line before section ('{name}')."
+        for index, name, canonical, _ in scan.sections
+        if canonical in names and scan.lines[index - 1].strip()
+    ]
+
+
+def _empty_sections(scan, names: dict) -> list:
+    return [
+        f"Section has no content ('{name}')."
+        for position, (_, name, canonical, _) in enumerate(scan.sections)
+        if canonical in names and not scan.section_content(position)
+    ]
+
+
+@rule("D405", "google")
+def _google_capitalization(scan, function_name):
+    return _misspelled_sections(scan, _GOOGLE_SECTIONS)
+
+
+@rule("D411", "google")
+def _google_blank_before(scan, function_name):
+    return _crowded_sections(scan, _GOOGLE_SECTIONS)
+
+
+@rule("D412", "google")
+def _google_blank_after(scan, function_name):
+    return [
+        f"No blank lines allowed between a section header and its content ('{name}')."
+        for position, (index, name, _, _) in enumerate(scan.sections)
+        if index + 1 < len(scan.lines) and not scan.lines[index + 1].strip() and scan.section_content(position)
+    ]
+
+
+@rule("D414", "google")
+def _google_content(scan, function_name):
+    return _empty_sections(scan, _GOOGLE_SECTIONS)
+
+
+@rule("D416", "google")
+def _google_colon(scan, function_name):
+    return [
+        f"Section name should end with a colon ('{name}:', not '{name}')."
+        for _, name, canonical, has_colon in scan.sections
+        if canonical in _GOOGLE_SECTIONS and not has_colon
+    ]
+
+
+@rule("D405", "numpy")
+def _numpy_capitalization(scan, function_name):
+    return _misspelled_sections(scan, _NUMPY_SECTIONS)
+
+
+@rule("D406", "numpy")
+def _numpy_no_colon(scan, function_name):
+    return [
+        f"Section name should end with a newline ('{name}', not '{name}:')."
+        for _, name, canonical, has_colon in scan.sections
+        if canonical in _NUMPY_SECTIONS and has_colon
+    ]
+
+
+@rule("D407", "numpy")
+def _numpy_underline(scan, function_name):
+    return [
+        f"Missing dashed underline after section ('{name}')."
+        for index, name, canonical, _ in scan.sections
+        if canonical in _NUMPY_SECTIONS
+        and (index + 1 >= len(scan.lines) or not _UNDERLINE.fullmatch(scan.lines[index + 1].strip()))
+    ]
+
+
+@rule("D409", "numpy")
+def _numpy_underline_length(scan, function_name):
+    errors = []
+    for index, name, canonical, _ in scan.sections:
+        underline = scan.lines[index + 1].strip() if index + 1 < len(scan.lines) else ""
+        if canonical in _NUMPY_SECTIONS and _UNDERLINE.fullmatch(underline) and len(underline) != len(name):
+            errors.append(
+                f"Section underline should match the length of its name ('{name}' has {len(name)} characters, "
+                f"the underline {len(underline)})."
+            )
+    return errors
+
+
+@rule("D411", "numpy")
+def _numpy_blank_before(scan, function_name):
+    return _crowded_sections(scan, _NUMPY_SECTIONS)
+
+
+@rule("D414", "numpy")
+def _numpy_content(scan, function_name):
+    return [
+        f"Section has no content ('{name}')."
+        for position, (_, name, canonical, _) in enumerate(scan.sections)
+        if canonical in _NUMPY_SECTIONS
+        and not [line for line in scan.section_content(position) if not _UNDERLINE.fullmatch(line.strip())]
+    ]
+
+
+@rule("D405", "rest")
+def _rest_field_case(scan, function_name):
+    return [
+        f"Section name should be properly capitalized (':{name.lower()}', not ':{name}')."
+        for _, name, _, _ in scan.fields
+        if not name.islower()
+    ]
+
+
+@rule("D411", "rest")
+def _rest_blank_before(scan, function_name):
+    if scan.fields:
+        index, name, argument, _ = scan.fields[0]
+        if scan.lines[index - 1].strip():
+            return f"Missing blank line before section (':{name}{' ' + argument if argument else ''}:')."
+
+
+@rule("D414", "rest")
+def _rest_content(scan, function_name):
+    errors = []
+    for index, name, argument, text in scan.fields:
+        following = scan.lines[index + 1] if index + 1 < len(scan.lines) else ""
+        # Descriptions may continue on the next, more indented, line
+        if not text and not (following.strip() and following[0].isspace()):
+            errors.append(f"Section has no content (':{name}{' ' + argument if argument else ''}:').")
+    return errors
+
+
+# Signature rules: what each style documents, checked against the function's AST
+
+
+def _entries(lines: list) -> list:
+    """Return the stripped lines at the smallest indentation of a section's content (its entries)."""
+    lines = [line for line in lines if not _UNDERLINE.fullmatch(line.strip())]
+    if not lines:
+        return []
+    indents = [len(line) - len(line.lstrip()) for line in lines]
+    least = min(indents)
+    return [line.strip() for line, indent in zip(lines, indents) if indent == least]
+
+
+def _google_documented(scan) -> dict:
+    documented = {"params": [], "has_params": False, "returns": False, "yields": False, "raises": []}
+    for position, (_, _, canonical, _) in enumerate(scan.sections):
+        if canonical not in _GOOGLE_SECTIONS:
+            continue
+        if canonical in _PARAM_SECTIONS or canonical in _RAISE_SECTIONS:
+            documented["has_params"] |= canonical in _PARAM_SECTIONS
+            names = documented["params" if canonical in _PARAM_SECTIONS else "raises"]
+            for entry in _entries(scan.section_content(position)):
+                match = _GOOGLE_ENTRY.match(entry)
+                if match:
+                    names.append(match.group(1))
+        elif canonical in _RETURN_SECTIONS:
+            documented["returns"] = True
+        elif canonical in _YIELD_SECTIONS:
+            documented["yields"] = True
+    return documented
+
+
+def _numpy_documented(scan) -> dict:
+    documented = {"params": [], "has_params": False, "returns": False, "yields": False, "raises": []}
+    for position, (_, _, canonical, _) in enumerate(scan.sections):
+        if canonical not in _NUMPY_SECTIONS:
+            continue
+        if canonical in _PARAM_SECTIONS:
+            documented["has_params"] = True
+            for entry in _entries(scan.section_content(position)):
+                # "x, y : int" documents both x and y
+                for name in _NUMPY_TYPE_SEPARATOR.split(entry, 1)[0].split(","):
+                    match = _NAME.fullmatch(name.strip())
+                    if match:
+                        documented["params"].append(match.group(1))
+        elif canonical in _RAISE_SECTIONS:
+            for entry in _entries(scan.section_content(position)):
+                match = _NAME.match(entry)
+                if match:
+                    documented["raises"].append(match.group(1))
+        elif canonical in _RETURN_SECTIONS:
+            documented["returns"] = True
+        elif canonical in _YIELD_SECTIONS:
+            documented["yields"] = True
+    return documented
+
+
+def _rest_documented(scan) -> dict:
+    documented = {"params": [], "has_params": False, "returns": False, "yields": False, "raises": []}
+    for _, name, argument, _ in scan.fields:
+        name = name.lower()
+        if name in _PARAM_FIELDS and argument:
+            documented["has_params"] = True
+            # ":param int x:" carries the type before the name
+            documented["params"].append(argument.split()[-1].lstrip("*"))
+        elif name in _RAISE_FIELDS and argument:
+            documented["raises"].append(argument)
+        elif name in _RETURN_SECTIONS:
+            documented["returns"] = True
+        elif name in _YIELD_SECTIONS:
+            documented["yields"] = True
+    return documented
+
+
+def _quoted(names) -> str:
+    return ", ".join(f"'{name}'" for name in names)
+
+
+def _checked_signature(scan):
+    """Return the signature to check the docstring against, or None for summary-only docstrings."""
+    if scan.signature is None or not (scan.sections or scan.fields):
+        return None
+    return scan.signature
+
+
+def _register_signature_rules(rule_set: str, extract):
+    @rule("D417", rule_set)
+    def _missing_arguments(scan, function_name):
+        signature = _checked_signature(scan)
+        # Like pydocstyle, only an existing parameters section must be complete
+        if signature is None or not scan.documented(extract)["has_params"]:
+            return None
+        documented = scan.documented(extract)["params"]
+        missing = [param["name"] for param in signature["params"] if param["name"] not in documented]
+        if missing:
+            return f"Missing argument descriptions in the docstring (argument(s) {_quoted(missing)})."
+
+    @rule("DAR102", rule_set)
+    def _stale_arguments(scan, function_name):
+        signature = _checked_signature(scan)
+        if signature is None:
+            return None
+        params = signature["params"]
+        # **kwargs may be documented key by key
+        if any(param["kind"] == "var_keyword" for param in params):
+            return None
+        names = {param["name"] for param in params}
+        stale = [name for name in scan.documented(extract)["params"] if name not in names]
+        if stale:
+            return f"Docstring documents argument(s) not in the signature ({_quoted(stale)})."
+
+    @rule("DAR201", rule_set)
+    def _missing_returns(scan, function_name):
+        signature = _checked_signature(scan)
+        # A property's summary describes the value it returns
+        if signature is None or signature["is_property"]:
+            return None
+        if signature["returns_value"] and not signature["yields"] and not scan.documented(extract)["returns"]:
+            return "Missing return value description; the function returns a value."
+
+    @rule("DAR202", rule_set)
+    def _stale_returns(scan, function_name):
+        signature = _checked_signature(scan)
+        if (
+            signature
+            and not signature["is_property"]
+            and scan.documented(extract)["returns"]
+            and not signature["returns_value"]
+            and not signature["yields"]
+            # Stubs and abstract methods document what implementations return
+            and signature["return_annotation"] in (None, "None")
+            and "NotImplementedError" not in signature["raises"]
+        ):
+            return "Return value documented, but the function does not return a value."
+
+    @rule("DAR301", rule_set)
+    def _missing_yields(scan, function_name):
+        signature = _checked_signature(scan)
+        if signature and signature["yields"] and not scan.documented(extract)["yields"]:
+            return "Missing yields description; the function is a generator."
+
+    @rule("DAR302", rule_set)
+    def _stale_yields(scan, function_name):
+        signature = _checked_signature(scan)
+        if signature and not signature["yields"] and scan.documented(extract)["yields"]:
+            return "Yields documented, but the function is not a generator."
+
+    @rule("DAR401", rule_set)
+    def _missing_raises(scan, function_name):
+        signature = _checked_signature(scan)
+        if signature is None:
+            return None
+        documented = {name.rsplit(".", 1)[-1] for name in scan.documented(extract)["raises"]}
+        missing = [
+            name for name in signature["raises"]
+            # Re-raised variables (`raise error`) and NotImplementedError are not documented
+            if name.rsplit(".", 1)[-1][:1].isupper()
+            and name != "NotImplementedError"
+            and name.rsplit(".", 1)[-1] not in documented
+        ]
+        if missing:
+            return f"Missing exception(s) raised by the function ({_quoted(missing)})."
+
+
+for _rule_set, _extract in (("google", _google_documented), ("numpy", _numpy_documented), ("rest", _rest_documented)):
+    _register_signature_rules(_rule_set, _extract)
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from services.lru import LRUCache
+
+# Directory holding the journals of Generate All jobs started from the app
+JOURNAL_DIR = os.getenv("JOB_JOURNAL_DIR", ".docstring_jobs")
+# Journals kept open by get_job; the least recently used one is closed beyond this
+JOB_JOURNAL_MAX_OPEN = int(os.getenv("JOB_JOURNAL_MAX_OPEN", "32"))
+
+# Item states that mean the expensive work (the LLM call) is finished
+COMPLETED_STATES = ("generated", "validated", "invalid", "accepted", "rejected", "done")
+FAILED_STATES = ("failed", "partial")
+# Item states that need nothing further from the user
+DECIDED_STATES = ("accepted", "rejected")
+
+
+class JobJournal:
+    """
+    Append-only JSONL record of a batch job, used to resume it after a crash.
+
+    The first line describes the job; every later line records a state change
+    of one item (a function, or a whole file for the CLI), e.g.
+    {"type": "item", "id": "Parser.parse", "state": "generated", "docstring": ...}.
+    Replaying the file folds those lines into the latest state of every item,
+    so a restarted job can skip items that are already complete. Each line is
+    flushed as soon as it is written; a truncated last line (from a crash
+    mid-write) is ignored on replay. A closed journal reopens its file on the
+    next write; a discarded one only keeps its state in memory.
+    """
+
+    def __init__(self, path: str, meta: dict = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._items = {}
+        self._opened_at = time.time()
+        self._completed_since_open = 0
+        self._discarded = False
+        self.meta = {}
+
+        if os.path.exists(path):
+            self._replay()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._handle = open(path, "a", encoding="utf-8")
+        if self._handle.tell() and not self._ends_with_newline():
+            # Terminate a line truncated by a crash so the next record starts cleanly
+            self._handle.write("\n")
+        if not self.meta:
+            self.meta = {"type": "job", "created": self._opened_at, **(meta or {})}
+            self._write(self.meta)
+
+    def record(self, item_id: str, state: str, **fields):
+        """
+        Append a state change for an item.
+
+        Args:
+            item_id: Identity of the item within the job
+            state: New state, e.g. "generated", "validated", "failed", "accepted"
+            **fields: JSON-serializable data to store with the item (docstring, issues, ...)
+        """
+        entry = {"type": "item", "id": item_id, "state": state, "at": time.time(), **fields}
+        with self._lock:
+            previous = self._items.get(item_id)
+            if state in COMPLETED_STATES and (previous is None or previous["state"] not in COMPLETED_STATES):
+                self._completed_since_open += 1
+            self._apply(entry)
+            self._write(entry)
+
+    def get(self, item_id: str):
+        """Return the latest state of an item (state plus every field recorded so far), or None."""
+        with self._lock:
+            item = self._items.get(item_id)
+            return dict(item) if item else None
+
+    def items(self) -> dict:
+        """Return a copy of the latest state of every item."""
+        with self._lock:
+            return {item_id: dict(item) for item_id, item in self._items.items()}
+
+    def completed(self) -> dict:
+        """Return the items whose work is finished and must not be repeated on resume."""
+        with self._lock:
+            return {
+                item_id: dict(item)
+                for item_id, item in self._items.items()
+                if item["state"] in COMPLETED_STATES
+            }
+
+    def progress(self, total: int = None) -> dict:
+        """
+        Summarize the job.
+
+        Args:
+            total: Number of items in the job, if known
+
+        Returns:
+            Dict with "total", "completed", "failed", "elapsed" (seconds since
+            this process opened the journal) and "throughput" (items completed
+            per second by this process, excluding resumed items)
+        """
+        with self._lock:
+            states = [item["state"] for item in self._items.values()]
+            elapsed = time.time() - self._opened_at
+            return {
+                "total": total if total is not None else len(states),
+                "completed": sum(1 for state in states if state in COMPLETED_STATES),
+                "failed": sum(1 for state in states if state in FAILED_STATES),
+                "elapsed": elapsed,
+                "throughput": self._completed_since_open / elapsed if elapsed > 0 else 0.0,
+            }
+
+    def decided(self, item_ids) -> bool:
+        """Return True if every one of `item_ids` has been accepted or rejected."""
+        with self._lock:
+            return all(self._items.get(item_id, {}).get("state") in DECIDED_STATES for item_id in item_ids)
+
+    def close(self):
+        with self._lock:
+            if not self._handle.closed:
+                self._handle.close()
+
+    def discard(self):
+        """Close the journal and delete its file; later records are kept in memory only."""
+        with self._lock:
+            self._discarded = True
+            if not self._handle.closed:
+                self._handle.close()
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _replay(self):
+        with open(self.path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get("type") == "job":
+                    self.meta = entry
+                elif entry.get("type") == "item":
+                    self._apply(entry)
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as handle:
+            handle.seek(-1, os.SEEK_END)
+            return handle.read(1) == b"\n"
+
+    def _apply(self, entry: dict):
+        fields = {key: value for key, value in entry.items() if key not in ("type", "id")}
+        item = self._items.setdefault(entry["id"], {})
+        item.update(fields)
+
+    def _write(self, entry: dict):
+        if self._discarded:
+            return
+        if self._handle.closed:
+            self._handle = open(self.path, "a", encoding="utf-8")
+        self._handle.write(json.dumps(entry) + "\n")
+        self._handle.flush()
+
+
+# Open journals by path; sessions still holding an evicted journal reopen its file on their next write
+_journals = LRUCache(JOB_JOURNAL_MAX_OPEN, on_evict=lambda path, journal: journal.close())
+_journals_lock = threading.Lock()
+
+
+def job_path(file_hash: str, style: str, engine: str) -> str:
+    """Return the journal path for generating one file's docstrings with a style and engine."""
+    name = hashlib.sha256(f"{file_hash}\0{style}\0{engine}".encode("utf-8")).hexdigest()[:24]
+    return os.path.join(JOURNAL_DIR, f"{name}.jsonl")
+
+
+def get_job(file_hash: str, style: str, engine: str, create: bool = True):
+    """
+    Return the process-wide journal for a file's generation job.
+
+    Args:
+        file_hash: Content hash of the file
+        style: Docstring style
+        engine: Generation engine ("llm" or "local")
+        create: Set to False to return None instead of starting a new journal
+
+    Returns:
+        The shared JobJournal, or None
+    """
+    path = job_path(file_hash, style, engine)
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is not None:
+            return journal
+        if not create and not os.path.exists(path):
+            return None
+        try:
+            journal = JobJournal(path, meta={"file_hash": file_hash, "style": style, "engine": engine})
+        except OSError:
+            # Unwritable location: journaling is best effort
+            return None
+        _journals.put(path, journal)
+        return journal
+
+
+def discard_job(file_hash: str, style: str, engine: str):
+    """Delete a finished job's journal so the journal directory does not grow without bound."""
+    with _journals_lock:
+        journal = _journals.pop(job_path(file_hash, style, engine), None)
+    if journal is not None:
+        journal.discard()
+    else:
+        try:
+            os.remove(job_path(file_hash, style, engine))
+        except FileNotFoundError:
+            pass
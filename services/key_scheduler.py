@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+
+# Latency assumed before any key has answered
+DEFAULT_LATENCY = 1.0
+
+
+class KeyScheduler:
+    """
+    Thread-safe, health-aware ordering of API keys.
+
+    Tracks per-key latency, error rate and rate-limit responses. Keys that keep
+    failing (or report a rate limit) have their circuit opened for an
+    exponentially growing cooldown; healthy keys are ordered by a weighted
+    shuffle that favours fast, reliable keys.
+    """
+
+    def __init__(self, keys: list, base_cooldown: float = 5.0, max_cooldown: float = 300.0,
+                 failure_threshold: int = 3, smoothing: float = 0.3):
+        """
+        Args:
+            keys: Hashable key identifiers, e.g. (provider, api_key) tuples
+            base_cooldown: Seconds a circuit stays open after its first trip
+            max_cooldown: Upper bound for the exponential cooldown
+            failure_threshold: Consecutive failures that open a circuit
+            smoothing: Weight of the newest sample in the moving averages
+        """
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.failure_threshold = failure_threshold
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._health = {
+            key: {
+                "latency": None,
+                "error_rate": 0.0,
+                "requests": 0,
+                "failures": 0,
+                "rate_limited": 0,
+                "consecutive_failures": 0,
+                "trips": 0,
+                "open_until": 0.0,
+            }
+            for key in keys
+        }
+
+    def candidates(self) -> list:
+        """
+        Return the keys to try for one request, best first.
+
+        Keys with an open circuit are skipped. If every circuit is open, only the
+        key closest to reopening is returned so it can be probed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [key for key, health in self._health.items() if health["open_until"] <= now]
+            if not healthy:
+                if not self._health:
+                    return []
+                return [min(self._health, key=lambda k: self._health[k]["open_until"])]
+            # Untried keys are scored like the fastest known key so they still get explored
+            known = [h["latency"] for h in self._health.values() if h["latency"] is not None]
+            optimistic_latency = min(known) if known else DEFAULT_LATENCY
+            weights = {key: self._weight(self._health[key], optimistic_latency) for key in healthy}
+
+        # Weighted shuffle: higher weight means more likely to be tried first
+        return sorted(healthy, key=lambda k: random.random() ** (1.0 / weights[k]), reverse=True)
+
+    def record_success(self, key, latency: float):
+        """Record a successful request and its latency in seconds."""
+        with self._lock:
+            health = self._health[key]
+            health["requests"] += 1
+            health["latency"] = latency if health["latency"] is None else self._smooth(health["latency"], latency)
+            health["error_rate"] = self._smooth(health["error_rate"], 0.0)
+            health["consecutive_failures"] = 0
+            health["trips"] = 0
+            health["open_until"] = 0.0
+
+    def record_failure(self, key, rate_limited: bool = False):
+        """
+        Record a failed request, opening the key's circuit when needed.
+
+        Args:
+            key: The key that failed
+            rate_limited: True for 429 / quota responses, which open the circuit immediately
+        """
+        with self._lock:
+            health = self._health[key]
+            health["requests"] += 1
+            health["failures"] += 1
+            health["error_rate"] = self._smooth(health["error_rate"], 1.0)
+            health["consecutive_failures"] += 1
+            if rate_limited:
+                health["rate_limited"] += 1
+
+            if rate_limited or health["consecutive_failures"] >= self.failure_threshold:
+                cooldown = min(self.base_cooldown * (2 ** health["trips"]), self.max_cooldown)
+                health["trips"] += 1
+                health["open_until"] = time.monotonic() + cooldown
+
+    def snapshot(self) -> dict:
+        """Return a copy of the health statistics for every key."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: dict(health, circuit_open=health["open_until"] > now)
+                for key, health in self._health.items()
+            }
+
+    def _smooth(self, average: float, sample: float) -> float:
+        return (1 - self.smoothing) * average + self.smoothing * sample
+
+    @staticmethod
+    def _weight(health: dict, default_latency: float) -> float:
+        latency = health["latency"] if health["latency"] is not None else default_latency
+        return max(1.0 - health["error_rate"], 0.05) / max(latency, 0.001)
@@ -0,0 +1,151 @@
+import ast
+import re
+import textwrap
+
+from services.ast_parser import summarize_function
+
+# Summary templates for common name prefixes; everything else is read as "<verb> <object>"
+_PREFIX_SUMMARIES = {
+    "is": "Check whether {rest}.",
+    "has": "Check whether it has {rest}.",
+    "can": "Check whether it can {rest}.",
+    "should": "Check whether it should {rest}.",
+    "to": "Convert to {rest}.",
+    "on": "Handle the {rest} event.",
+}
+
+_SPECIAL_SUMMARIES = {
+    "__init__": "Initialize the instance.",
+    "__repr__": "Return the developer representation of the instance.",
+    "__str__": "Return the string representation of the instance.",
+    "__eq__": "Check equality with another object.",
+    "__hash__": "Return the hash of the instance.",
+    "__len__": "Return the number of items.",
+    "__iter__": "Iterate over the items.",
+    "__call__": "Call the instance.",
+    "__enter__": "Enter the runtime context.",
+    "__exit__": "Exit the runtime context.",
+}
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def synthesize_docstring(source_code: str = "", style: str = "Google", node=None) -> str:
+    """
+    Build a docstring skeleton directly from a function's AST, without an LLM.
+
+    The summary is derived from the function name; parameters (with annotations
+    and defaults), return value, yields and raised exceptions come from the AST.
+
+    Args:
+        source_code: The function source code (parsed if `node` is not given)
+        style: Docstring style (Google, NumPy, or reST)
+        node: Optional AST node of the function
+
+    Returns:
+        Docstring text without surrounding quotes
+    """
+    if node is None:
+        node = ast.parse(textwrap.dedent(source_code)).body[0]
+
+    info = summarize_function(node)
+    summary = _summary_from_name(node.name)
+    builder = {"NumPy": _numpy_sections, "reST": _rest_sections}.get(style, _google_sections)
+    sections = builder(info)
+
+    if not sections:
+        return summary
+    return summary + "\n\n" + "\n\n".join(sections)
+
+
+def _summary_from_name(name: str) -> str:
+    """Turn a function name like `load_user_config` into "Load user config."."""
+    if name in _SPECIAL_SUMMARIES:
+        return _SPECIAL_SUMMARIES[name]
+
+    words = _words(name)
+    if not words:
+        return "Run the function."
+
+    prefix, rest = words[0], " ".join(words[1:])
+    if prefix in _PREFIX_SUMMARIES and rest:
+        return _PREFIX_SUMMARIES[prefix].format(rest=rest)
+    return " ".join([prefix.capitalize()] + words[1:]) + "."
+
+
+def _words(name: str) -> list:
+    name = _CAMEL_BOUNDARY.sub("_", name.strip("_"))
+    return [word.lower() for word in name.split("_") if word]
+
+
+def _describe(name: str) -> str:
+    return "The " + " ".join(_words(name) or [name]) + "."
+
+
+def _param_label(param: dict) -> str:
+    prefix = {"var_positional": "*", "var_keyword": "**"}.get(param["kind"], "")
+    return prefix + param["name"]
+
+
+def _google_sections(info: dict) -> list:
+    sections = []
+    if info["params"]:
+        lines = ["Args:"]
+        for param in info["params"]:
+            annotation = f" ({param['annotation']})" if param["annotation"] else ""
+            default = f" Defaults to {param['default']}." if param["default"] is not None else ""
+            lines.append(f"    {_param_label(param)}{annotation}: {_describe(param['name'])}{default}")
+        sections.append("\n".join(lines))
+    if info["yields"]:
+        sections.append("Yields:\n    " + _typed(info["return_annotation"], "The generated values."))
+    elif info["returns_value"]:
+        sections.append("Returns:\n    " + _typed(info["return_annotation"], "The result."))
+    if info["raises"]:
+        sections.append("Raises:\n" + "\n".join(f"    {exc}: If the operation fails." for exc in info["raises"]))
+    return sections
+
+
+def _numpy_sections(info: dict) -> list:
+    sections = []
+    if info["params"]:
+        lines = ["Parameters", "----------"]
+        for param in info["params"]:
+            annotation = param["annotation"] or ""
+            if param["default"] is not None:
+                annotation = f"{annotation}, optional" if annotation else "optional"
+            lines.append(f"{_param_label(param)} : {annotation}".rstrip(" :"))
+            default = f" Default is {param['default']}." if param["default"] is not None else ""
+            lines.append(f"    {_describe(param['name'])}{default}")
+        sections.append("\n".join(lines))
+    if info["yields"] or info["returns_value"]:
+        title = "Yields" if info["yields"] else "Returns"
+        description = "The generated values." if info["yields"] else "The result."
+        sections.append(f"{title}\n{'-' * len(title)}\n{info['return_annotation'] or 'object'}\n    {description}")
+    if info["raises"]:
+        lines = ["Raises", "------"]
+        for exc in info["raises"]:
+            lines.extend([exc, "    If the operation fails."])
+        sections.append("\n".join(lines))
+    return sections
+
+
+def _rest_sections(info: dict) -> list:
+    lines = []
+    for param in info["params"]:
+        default = f" Defaults to {param['default']}." if param["default"] is not None else ""
+        lines.append(f":param {param['name']}: {_describe(param['name'])}{default}")
+        if param["annotation"]:
+            lines.append(f":type {param['name']}: {param['annotation']}")
+    if info["yields"]:
+        lines.append(":yields: The generated values.")
+    elif info["returns_value"]:
+        lines.append(":returns: The result.")
+        if info["return_annotation"]:
+            lines.append(f":rtype: {info['return_annotation']}")
+    for exc in info["raises"]:
+        lines.append(f":raises {exc}: If the operation fails.")
+    return ["\n".join(lines)] if lines else []
+
+
+def _typed(annotation, description: str) -> str:
+    return f"{annotation}: {description}" if annotation else description
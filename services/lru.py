@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe mapping bounded to `max_entries`, evicting the least recently used entry.
+
+    Lookups through get() count as hits or misses and mark the entry as
+    recently used. The optional `on_evict` callback receives each evicted
+    (key, value) pair, e.g. to close a file the value holds.
+    """
+
+    def __init__(self, max_entries: int, on_evict=None):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._on_evict = on_evict
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        """Return the value for `key` (marking it recently used), or `default`."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries beyond the limit."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+        if self._on_evict:
+            for item in evicted:
+                self._on_evict(*item)
+
+    def pop(self, key, default=None):
+        """Remove and return the value for `key`, or `default`; no eviction callback is made."""
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of entries."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
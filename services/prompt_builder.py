@@ -0,0 +1,182 @@
+import ast
+import copy
+import os
+
+# Functions larger than this (in estimated tokens) are trimmed before prompting
+DEFAULT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+
+# Literal elision thresholds
+MAX_LITERAL_ITEMS = 8
+MAX_STRING_LENGTH = 200
+
+_CONTROL_FLOW = (
+    ast.If, ast.For, ast.AsyncFor, ast.While, ast.Try, ast.With, ast.AsyncWith, ast.Match,
+)
+if hasattr(ast, "TryStar"):
+    _CONTROL_FLOW += (ast.TryStar,)
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# Trimming levels, from least to most aggressive:
+# (elide plain statements deeper than this depth, drop plain statements everywhere, max control-flow depth)
+_TRIM_LEVELS = [
+    (None, False, None),  # only shorten long literals
+    (1, False, None),     # keep top-level statements, skeletonize nested blocks
+    (0, True, 3),         # control flow + return/raise/yield only
+    (0, True, 1),         # return/raise/yield only
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of LLM tokens in `text` (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def build_function_excerpt(source_code: str, node=None, token_budget: int = DEFAULT_TOKEN_BUDGET) -> dict:
+    """
+    Build the function text to embed in a prompt, trimmed to a token budget.
+
+    Functions within budget are returned verbatim. Larger ones are rebuilt from
+    their AST node keeping the decorators, signature, return/raise/yield
+    statements and control-flow skeleton, while long literals and deep bodies
+    are replaced by `...`. Trimming gets progressively more aggressive until the
+    excerpt fits (or no further reduction is possible).
+
+    Args:
+        source_code: The function source code
+        node: The function's AST node (the "node" entry from parse_functions)
+        token_budget: Maximum estimated tokens for the excerpt
+
+    Returns:
+        Dict with the excerpt "code" plus "original_tokens", "prompt_tokens"
+        and "tokens_saved"
+    """
+    original_tokens = estimate_tokens(source_code)
+    best_code, best_tokens = source_code, original_tokens
+
+    if node is not None and original_tokens > token_budget:
+        for plain_depth, drop_plain, max_depth in _TRIM_LEVELS:
+            trimmed = _Skeletonizer(plain_depth, drop_plain, max_depth).visit(copy.deepcopy(node))
+            code = ast.unparse(ast.fix_missing_locations(trimmed))
+            tokens = estimate_tokens(code)
+            if tokens < best_tokens:
+                best_code, best_tokens = code, tokens
+            if tokens <= token_budget:
+                break
+
+    return {
+        "code": best_code,
+        "original_tokens": original_tokens,
+        "prompt_tokens": best_tokens,
+        "tokens_saved": original_tokens - best_tokens,
+    }
+
+
+def _ellipsis(template):
+    return ast.copy_location(ast.Expr(value=ast.Constant(value=...)), template)
+
+
+def _is_kept_statement(stmt) -> bool:
+    """Return True for statements that describe a function's contract."""
+    if isinstance(stmt, (ast.Return, ast.Raise)):
+        return True
+    return isinstance(stmt, ast.Expr) and isinstance(stmt.value, (ast.Yield, ast.YieldFrom))
+
+
+def _contract_statements(statements) -> list:
+    """Collect return/raise/yield statements under `statements`, skipping nested definitions."""
+    found = []
+    pending = list(statements)
+    while pending:
+        stmt = pending.pop(0)
+        if isinstance(stmt, _DEFINITIONS):
+            continue
+        if _is_kept_statement(stmt):
+            if not any(ast.dump(stmt) == ast.dump(seen) for seen in found):
+                found.append(stmt)
+            continue
+        for child in ast.iter_child_nodes(stmt):
+            if isinstance(child, ast.stmt):
+                pending.append(child)
+            elif isinstance(child, (ast.excepthandler, ast.match_case)):
+                pending.extend(child.body)
+    return found
+
+
+class _Skeletonizer(ast.NodeTransformer):
+    """Rewrite a function node into a shorter skeleton (see _TRIM_LEVELS)."""
+
+    def __init__(self, plain_depth, drop_plain, max_depth):
+        self.plain_depth = plain_depth
+        self.drop_plain = drop_plain
+        self.max_depth = max_depth
+
+    def visit_FunctionDef(self, node):
+        node.decorator_list = [self.visit(d) for d in node.decorator_list]
+        node.body = self._trim_body(node.body, depth=0)
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _trim_body(self, body, depth):
+        trimmed = []
+        for stmt in body:
+            if isinstance(stmt, _DEFINITIONS):
+                # Nested definitions keep their header only
+                stmt.body = [_ellipsis(stmt)]
+                trimmed.append(stmt)
+            elif _is_kept_statement(stmt):
+                trimmed.append(self.visit(stmt))
+            elif isinstance(stmt, _CONTROL_FLOW):
+                if self.max_depth is not None and depth + 1 >= self.max_depth:
+                    # Too deep: replace the whole block by what it returns/raises/yields
+                    trimmed.extend(self.visit(s) for s in _contract_statements([stmt]))
+                else:
+                    trimmed.append(self._trim_compound(stmt, depth + 1))
+            elif self.drop_plain or (self.plain_depth is not None and depth >= self.plain_depth):
+                if not trimmed or not _is_ellipsis(trimmed[-1]):
+                    trimmed.append(_ellipsis(stmt))
+            else:
+                trimmed.append(self.visit(stmt))
+        return trimmed or [_ellipsis(body[0])]
+
+    def _trim_compound(self, stmt, depth):
+        for field in ("body", "orelse", "finalbody"):
+            block = getattr(stmt, field, None)
+            if block:
+                setattr(stmt, field, self._trim_body(block, depth))
+        for handler in getattr(stmt, "handlers", []):
+            handler.body = self._trim_body(handler.body, depth)
+        for case in getattr(stmt, "cases", []):
+            case.body = self._trim_body(case.body, depth)
+        # Headers (conditions, iterables, context managers) only get literal elision
+        for field in ("test", "iter", "subject"):
+            value = getattr(stmt, field, None)
+            if value is not None:
+                setattr(stmt, field, self.visit(value))
+        return stmt
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, (str, bytes)) and len(node.value) > MAX_STRING_LENGTH:
+            marker = "..." if isinstance(node.value, str) else b"..."
+            node.value = node.value[:MAX_STRING_LENGTH] + marker
+        return node
+
+    def _trim_sequence(self, node):
+        self.generic_visit(node)
+        if len(node.elts) > MAX_LITERAL_ITEMS:
+            node.elts = node.elts[:3] + [ast.Constant(value=...)]
+        return node
+
+    visit_List = visit_Tuple = visit_Set = _trim_sequence
+
+    def visit_Dict(self, node):
+        self.generic_visit(node)
+        if len(node.keys) > MAX_LITERAL_ITEMS:
+            node.keys = node.keys[:3] + [ast.Constant(value=...)]
+            node.values = node.values[:3] + [ast.Constant(value=...)]
+        return node
+
+
+def _is_ellipsis(stmt) -> bool:
+    return isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant) and stmt.value.value is ...
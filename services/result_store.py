@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from services.lru import LRUCache
+
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "5000"))
+# Optional SQLite file that keeps results across server restarts
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH")
+
+# Only final decisions are shared; "editing" is private to the session doing it
+SHARED_DECISIONS = ("accepted", "rejected")
+
+
+def file_fingerprint(code: str) -> str:
+    """Return the content hash used to identify an uploaded file."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def generation_key(engine: str, style: str) -> str:
+    """Return the key of a generated docstring within an entry's "generated" dict."""
+    return f"{engine}:{style}"
+
+
+class ResultStore:
+    """
+    Process-wide store of generated docstrings and review decisions.
+
+    Entries are keyed by (file content hash, function identity) and shared by
+    every session of the Streamlit server. Memory is bounded by an LRU limit;
+    when a path is given, entries are also written through to SQLite and read
+    back on a memory miss.
+
+    Each entry is a dict with:
+    - generated: dict of generation_key(engine, style) -> generated docstring
+    - decision: {"status", "docstring"} for accepted/rejected functions, or None
+    """
+
+    def __init__(self, path: str = None, max_entries: int = RESULT_STORE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = LRUCache(max_entries)
+        self._conn = None
+
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " file_hash TEXT NOT NULL,"
+                " function_id TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " last_access REAL NOT NULL,"
+                " PRIMARY KEY (file_hash, function_id))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access ON results (last_access)")
+
+    def get(self, file_hash: str, function_id: str):
+        """Return a copy of the entry for a function, or None if nothing is stored."""
+        with self._lock:
+            entry = self._load((file_hash, function_id))
+            if entry is None:
+                return None
+            return {"generated": dict(entry["generated"]), "decision": entry["decision"]}
+
+    def record_generation(self, file_hash: str, function_id: str, engine: str, style: str, docstring: str):
+        """Store a generated docstring for a function, engine and style."""
+        with self._lock:
+            entry = self._load((file_hash, function_id)) or {"generated": {}, "decision": None}
+            entry["generated"][generation_key(engine, style)] = docstring
+            self._save((file_hash, function_id), entry)
+
+    def record_decision(self, file_hash: str, function_id: str, decision: dict):
+        """
+        Store a review decision for a function.
+
+        Args:
+            file_hash: Content hash of the file
+            function_id: Function identity within the file
+            decision: Session decision dict; only "status" and "docstring" are kept,
+                and statuses other than accepted/rejected clear the shared decision
+        """
+        shared = None
+        if decision and decision.get("status") in SHARED_DECISIONS:
+            shared = {"status": decision["status"], "docstring": decision.get("docstring")}
+
+        with self._lock:
+            entry = self._load((file_hash, function_id)) or {"generated": {}, "decision": None}
+            entry["decision"] = shared
+            self._save((file_hash, function_id), entry)
+
+    def stats(self) -> dict:
+        """Return the number of entries held in memory."""
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries}
+
+    def _load(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        if self._conn is None:
+            return None
+
+        row = self._conn.execute(
+            "SELECT payload FROM results WHERE file_hash = ? AND function_id = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        entry = json.loads(row[0])
+        self._entries.put(key, entry)
+        return entry
+
+    def _save(self, key, entry):
+        self._entries.put(key, entry)
+        if self._conn is None:
+            return
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (file_hash, function_id, payload, last_access) VALUES (?, ?, ?, ?)",
+            (*key, json.dumps(entry), time.time()),
+        )
+        overflow = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE rowid IN "
+                "(SELECT rowid FROM results ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """Return the process-wide result store, creating it on first use."""
+    global _store
+
+    with _store_lock:
+        if _store is None:
+            try:
+                _store = ResultStore(path=RESULT_STORE_PATH)
+            except sqlite3.Error:
+                # Unwritable location: share results in memory only
+                _store = ResultStore()
+        return _store
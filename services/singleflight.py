@@ -0,0 +1,142 @@
+import threading
+
+
+class _Call:
+    """One in-flight call whose result is shared by every waiter."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _StreamCall:
+    """One in-flight stream whose chunks are replayed to every follower."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.chunks = []
+        self.finished = False
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplicate identical concurrent calls.
+
+    While a call for a key is in flight, other callers with the same key wait
+    for it and receive its result (or its exception) instead of starting their
+    own. Once the call finishes the key is forgotten, so later calls run again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        """
+        Run `fn()` for `key`, or join the identical call already in flight.
+
+        Args:
+            key: Hashable identity of the call
+            fn: Zero-argument callable producing the result
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stream(self, key, fn):
+        """
+        Iterate `fn()` for `key`, or follow the identical stream already in flight.
+
+        Followers receive every chunk the leader has produced so far and then
+        each new chunk as it arrives.
+
+        Args:
+            key: Hashable identity of the stream
+            fn: Zero-argument callable returning an iterable of chunks
+
+        Yields:
+            The chunks of the (possibly shared) stream
+        """
+        with self._lock:
+            call = self._streams.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = self._streams[key] = _StreamCall()
+                leader = True
+
+        if leader:
+            yield from self._lead(key, call, fn)
+        else:
+            yield from self._follow(call)
+
+    def in_flight(self) -> int:
+        """Return the number of distinct calls and streams currently running."""
+        with self._lock:
+            return len(self._calls) + len(self._streams)
+
+    def _lead(self, key, call, fn):
+        try:
+            for chunk in fn():
+                with call.condition:
+                    call.chunks.append(chunk)
+                    call.condition.notify_all()
+                yield chunk
+        except GeneratorExit:
+            call.error = RuntimeError("Shared stream was abandoned before it finished")
+            raise
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._streams[key]
+            with call.condition:
+                call.finished = True
+                call.condition.notify_all()
+
+    @staticmethod
+    def _follow(call):
+        position = 0
+        while True:
+            with call.condition:
+                while position >= len(call.chunks) and not call.finished:
+                    call.condition.wait()
+                if position < len(call.chunks):
+                    chunk = call.chunks[position]
+                    position += 1
+                elif call.error is not None:
+                    raise call.error
+                else:
+                    return
+            yield chunk
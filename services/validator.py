@@ -1,167 +1,281 @@
-import ast
-import tempfile
+import hashlib
 import os
+import threading
+from functools import lru_cache
 
+from services.ast_parser import summarize_function
+from services.code_inserter import format_docstring_literal
+from services.docstring_rules import DEFAULT_RULES, check_docstring, is_selected, rule_codes, rules_for_style
+from services.lru import LRUCache
 
-def validate_docstring(docstring: str, function_name: str = "temp_func"):
+MISSING_DOCSTRING = "[D100] Missing docstring in public function"
+
+# Validation results remembered by docstring content, function name, signature and rule selection
+VALIDATION_CACHE_MAX_ENTRIES = int(os.getenv("VALIDATION_CACHE_MAX_ENTRIES", "4096"))
+
+
+class ValidationCache:
+    """
+    Process-wide LRU of validation results.
+    
+    Streamlit reruns the whole script on every interaction, re-validating
+    the same docstrings; results depend only on the docstring, the function
+    name and signature and the selected rules, so repeats are answered from
+    memory.
+    """
+    
+    def __init__(self, max_entries: int = VALIDATION_CACHE_MAX_ENTRIES):
+        self._entries = LRUCache(max_entries)
+    
+    @staticmethod
+    def key(docstring: str, function_name: str, rules, signature: dict = None) -> tuple:
+        """Return the cache key for validating a docstring."""
+        if signature is not None:
+            signature = (
+                tuple((param["name"], param["kind"]) for param in signature["params"]),
+                signature["return_annotation"],
+                signature["returns_value"],
+                signature["yields"],
+                tuple(signature["raises"]),
+                signature["is_property"],
+            )
+        return (hashlib.sha256(docstring.encode("utf-8")).hexdigest(), function_name, tuple(rules), signature)
+    
+    def get(self, key: tuple):
+        """Return a copy of the cached error list for a key, or None."""
+        errors = self._entries.get(key)
+        return None if errors is None else list(errors)
+    
+    def put(self, key: tuple, errors: list):
+        self._entries.put(key, tuple(errors))
+    
+    def stats(self) -> dict:
+        """Return hit/miss counters and the number of cached results."""
+        return self._entries.stats()
+
+
+_validation_cache = ValidationCache()
+
+
+def get_validation_cache() -> ValidationCache:
+    """Return the process-wide validation cache."""
+    return _validation_cache
+
+
+def validate_docstring(
+    docstring: str, function_name: str = "temp_func", rules: tuple = DEFAULT_RULES, signature: dict = None
+):
     """
     Validate docstring against PEP 257 conventions using multiple checks.
     
+    The built-in rule engine runs first; pydocstyle, when installed, adds
+    the codes the engine does not implement. Results are memoized.
+    
     Args:
         docstring: The docstring to validate
         function_name: Optional function name for context
+        rules: Rule sets or codes to check (see rules_for_style)
+        signature: Optional summarize_function() result; with a style's rules,
+            documented parameters, returns, yields and raises are checked against it
     
     Returns:
         List of error strings with format "[ErrorCode] Message"
     """
     if not docstring or not docstring.strip():
-        return ["[D100] Missing docstring in public function"]
-    
-    errors = []
-    
-    # Parse docstring lines
-    raw_lines = docstring.splitlines()
-    lines = [line.rstrip() for line in raw_lines]
-    
-    # Trim leading/trailing blank lines for analysis
-    while lines and not lines[0].strip():
-        lines.pop(0)
-    while lines and not lines[-1].strip():
-        lines.pop()
-    
-    if not lines:
-        return ["[D100] Missing docstring in public function"]
-    
-    summary = lines[0].strip()
-    
-    # D400: First line should end with a period
-    if not summary.endswith("."):
-        errors.append("[D400] First line should end with a period.")
-    
-    # D401: First line should be in imperative mood
-    non_imperative = [
-        "returns", "computes", "calculates", "determines", "gets",
-        "retrieves", "identifies", "processes", "handles", "represents",
-        "defines", "performs", "executes", "stores", "creates",
-        "generates", "initializes", "sets", "updates", "modifies",
-        "changes", "converts", "transforms", "formats", "parses",
-        "analyzes", "checks", "validates", "verifies", "prints",
-        "displays", "shows", "outputs", "reads", "writes",
-        "opens", "closes", "saves", "deletes", "removes",
-        "sorts", "searches", "finds", "contains", "has",
-        "is", "are", "was", "were", "be", "being", "been"
-    ]
-    first_word = summary.split()[0].lower().rstrip(".,:;!?")
-    if first_word in non_imperative:
-        # Convert to imperative form
-        imperative_map = {
-            "calculates": "Calculate", "computes": "Compute", "determines": "Determine",
-            "gets": "Get", "retrieves": "Retrieve", "identifies": "Identify",
-            "processes": "Process", "handles": "Handle", "represents": "Represent",
-            "defines": "Define", "performs": "Perform", "executes": "Execute",
-            "stores": "Store", "creates": "Create", "generates": "Generate",
-            "initializes": "Initialize", "sets": "Set", "updates": "Update",
-            "modifies": "Modify", "changes": "Change", "converts": "Convert",
-            "transforms": "Transform", "formats": "Format", "parses": "Parse",
-            "analyzes": "Analyze", "checks": "Check", "validates": "Validate",
-            "verifies": "Verify", "prints": "Print", "displays": "Display",
-            "shows": "Show", "outputs": "Output", "reads": "Read", "writes": "Write",
-            "opens": "Open", "closes": "Close", "saves": "Save", "deletes": "Delete",
-            "removes": "Remove", "sorts": "Sort", "searches": "Search", "finds": "Find",
-            "contains": "Include", "returns": "Return", "is": "Be", "are": "Be",
-            "was": "Be", "were": "Be", "being": "Be", "been": "Be",
-        }
-        imperative = imperative_map.get(first_word, first_word.capitalize())
-        errors.append(f"[D401] First line should be in imperative mood; change '{summary.split()[0]}' to '{imperative}'.")
-    
-    # D402: First line should not be a function signature
-    if "(" in summary and ")" in summary:
-        errors.append("[D402] First line should not be a function signature.")
-    
-    # D213: Multi-line docstring summary should be on the first line
-    if len(lines) > 1:
-        if lines[1].strip():
-            # Second line has content - check if this is intentional
-            if not summary.endswith(":"):
-                errors.append("[D213] Multi-line docstring summary should be on the first line; use a period to end the summary.")
-    
-    # D209: Multi-line docstring closing quotes should be on a separate line  
-    if len(lines) > 2:
-        last_line = lines[-1].strip()
-        second_last = lines[-2].strip() if len(lines) > 1 else ""
-        # If last line has content and isn't just closing quotes
-        if last_line and last_line not in ('"""', "'''", 'r"""', "r'''"):
-            errors.append("[D209] Multi-line docstring closing quotes should be on a separate line.")
-    
-    # D301: Use r""" if backslashes in docstring
-    if any("\\" in line for line in lines):
-        errors.append("[D301] Use r\"\"\" if any backslashes in a docstring.")
-    
-    # D206: Docstring should be indented with spaces, not tabs  
-    if any("\t" in line for line in lines):
-        errors.append("[D206] Docstring should be indented with spaces, not tabs.")
-    
-    # Try to validate with pydocstyle if available
-    try:
-        pydoc_errors = _validate_with_pydocstyle(docstring, function_name)
-        # Add any D-code errors from pydocstyle that we haven't already caught
-        for error in pydoc_errors:
-            if not any(code in err for code in ["[D400]", "[D401]", "[D402]", "[D213]", "[D209]", "[D301]", "[D206]"] for err in errors):
-                if error and error not in errors:
-                    errors.append(error)
-    except Exception:
-        # pydocstyle validation failed, that's ok
-        pass
+        return [MISSING_DOCSTRING]
     
+    cache = get_validation_cache()
+    key = cache.key(docstring, function_name, rules, signature)
+    errors = cache.get(key)
+    if errors is None:
+        errors = check_docstring(docstring, function_name, rules, signature)
+        errors += _validate_with_pydocstyle(docstring, function_name, rules)
+        cache.put(key, errors)
     return errors
 
 
-def _validate_with_pydocstyle(docstring: str, function_name: str = "temp_func"):
+def validate_function(func, docstring: str = None, rules: tuple = DEFAULT_RULES):
+    """
+    Validate a docstring for a parsed function, including its signature.
+    
+    Args:
+        func: Function record from parse_functions
+        docstring: The docstring to validate (defaults to the function's own)
+        rules: Rule sets or codes to check (see rules_for_style)
+    
+    Returns:
+        List of error strings with format "[ErrorCode] Message"
+    """
+    if docstring is None:
+        docstring = func["docstring"]
+    return validate_docstring(docstring, func["name"], rules, signature=summarize_function(func["node"]))
+
+
+def validate_many(
+    docstrings: dict, function_names: dict = None, rules: tuple = DEFAULT_RULES, signatures: dict = None
+) -> dict:
+    """
+    Validate many docstrings (e.g. every generated docstring of a file) in one pass.
+    
+    The docstrings are written into a single synthetic module that pydocstyle
+    checks once; its violations are mapped back to each docstring by the line
+    of its function. Results are the same as calling validate_docstring on
+    each docstring; docstrings validated before are served from the cache.
+    
+    Args:
+        docstrings: Mapping of a key (e.g. function identity) to its docstring
+        function_names: Optional mapping of the same keys to function names
+        rules: Rule sets or codes to check (see rules_for_style)
+        signatures: Optional mapping of the same keys to summarize_function()
+            results (see summarize_functions, which reads a whole file in one pass)
+    
+    Returns:
+        Mapping of each key to its list of error strings
+    """
+    function_names = function_names or {}
+    signatures = signatures or {}
+    cache = get_validation_cache()
+    results = {}
+    checked = {}
+    for key, docstring in docstrings.items():
+        if not docstring or not docstring.strip():
+            results[key] = [MISSING_DOCSTRING]
+            continue
+        function_name = function_names.get(key, "temp_func")
+        results[key] = cache.get(cache.key(docstring, function_name, rules, signatures.get(key)))
+        if results[key] is None:
+            results[key] = check_docstring(docstring, function_name, rules, signatures.get(key))
+            checked[key] = docstring
+    
+    pydoc_errors = _validate_many_with_pydocstyle(checked, function_names, rules)
+    for key, docstring in checked.items():
+        results[key].extend(pydoc_errors.get(key, []))
+        cache.put(cache.key(docstring, function_names.get(key, "temp_func"), rules, signatures.get(key)), results[key])
+    return results
+
+
+def _validate_with_pydocstyle(docstring: str, function_name: str = "temp_func", rules: tuple = DEFAULT_RULES):
     """
-    Validate using pydocstyle tool.
+    Validate using pydocstyle, entirely in memory.
+    
+    The docstring is checked inside a synthetic function, written the way
+    the code inserter would write it. The checker is built once and shared
+    by every call, but checks run one at a time: pydocstyle parses through a
+    module-level Parser that keeps per-call state. Only selected codes that
+    the rule engine does not implement are reported.
     
     Args:
         docstring: The docstring to validate
         function_name: Function name for context
+        rules: Rule sets or codes to check
     
     Returns:
-        List of error strings
+        List of error strings (empty if pydocstyle is not installed)
     """
-    try:
-        from pydocstyle import config, checker as pydoc_checker
-        
-        # Create temporary Python file
-        temp_code = f'''def {function_name}():
-    """{docstring}"""
-    pass
-'''
-        
-        # Write to temporary file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-            f.write(temp_code)
-            temp_file = f.name
-        
-        try:
-            # Check with pydocstyle
-            cfg = config.Configuration()
-            errors = []
-            for error in pydoc_checker.check_file(temp_file, config=cfg):
-                if hasattr(error, 'code') and hasattr(error, 'short_desc'):
-                    errors.append(f"[{error.code}] {error.short_desc}")
-            return errors
-        finally:
-            # Clean up
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+    pydocstyle = _get_pydocstyle()
+    if pydocstyle is None:
+        return []
+    checker = pydocstyle
+    select = _pydocstyle_codes(tuple(rules))
     
+    temp_code = f"def {function_name}():\n    {format_docstring_literal(docstring, '    ')}\n    pass\n"
+    try:
+        return [
+            f"[{error.code}] {error.short_desc}"
+            for error in _check_source(checker, temp_code, f"{function_name}.py")
+            if error.code in select
+        ]
     except Exception:
-        # If pydocstyle fails, return empty list (falling back to manual checks)
+        # If pydocstyle fails, return empty list (falling back to the rule engine)
         return []
 
 
+def _validate_many_with_pydocstyle(docstrings: dict, function_names: dict, rules: tuple = DEFAULT_RULES) -> dict:
+    """
+    Validate many docstrings with a single pydocstyle pass.
+    
+    Args:
+        docstrings: Mapping of keys to non-empty docstrings
+        function_names: Mapping of keys to function names (missing keys use "temp_func")
+        rules: Rule sets or codes to check
+    
+    Returns:
+        Mapping of keys to error strings (keys without errors may be absent)
+    """
+    pydocstyle = _get_pydocstyle()
+    if pydocstyle is None or not docstrings:
+        return {}
+    checker = pydocstyle
+    select = _pydocstyle_codes(tuple(rules))
+    
+    parts = []
+    keys_by_line = {}
+    line = 1
+    for key, docstring in docstrings.items():
+        function_name = function_names.get(key, "temp_func")
+        part = f"def {function_name}():\n    {format_docstring_literal(docstring, '    ')}\n    pass\n\n"
+        keys_by_line[line] = key
+        parts.append(part)
+        line += part.count("\n")
+    
+    errors = {}
+    try:
+        for error in _check_source(checker, "".join(parts), "docstrings.py"):
+            key = keys_by_line.get(error.definition.start)
+            if key is not None and error.code in select:
+                errors.setdefault(key, []).append(f"[{error.code}] {error.short_desc}")
+    except Exception:
+        # One docstring that breaks the synthetic module must not hide the others' results
+        return {
+            key: _validate_with_pydocstyle(docstring, function_names.get(key, "temp_func"), rules)
+            for key, docstring in docstrings.items()
+        }
+    return errors
+
+
+_pydocstyle = None
+_pydocstyle_lock = threading.Lock()
+# pydocstyle's module-level Parser is not thread-safe, so concurrent sessions take turns
+_pydocstyle_check_lock = threading.Lock()
+
+
+def _get_pydocstyle():
+    """Return the shared pydocstyle checker, or None if pydocstyle is unavailable."""
+    global _pydocstyle
+    
+    with _pydocstyle_lock:
+        if _pydocstyle is None:
+            try:
+                from pydocstyle.checker import ConventionChecker
+            except ImportError:
+                _pydocstyle = False
+            else:
+                _pydocstyle = ConventionChecker()
+        return _pydocstyle or None
+
+
+def _check_source(checker, source: str, filename: str) -> list:
+    """Run the shared checker over `source`, holding the lock until every error is collected."""
+    with _pydocstyle_check_lock:
+        return list(checker.check_source(source, filename))
+
+
+@lru_cache(maxsize=None)
+def _pydocstyle_codes(rules: tuple) -> frozenset:
+    """Return the pydocstyle codes to report for a rule selection."""
+    try:
+        from pydocstyle.violations import conventions
+    except ImportError:
+        return frozenset()
+    # pydocstyle's default convention, minus what the rule engine checks itself for
+    # this selection; the synthetic module has no docstring of its own
+    codes = frozenset(conventions.pep257) - {"D100", "D104"} - rule_codes(rules)
+    return frozenset(code for code in codes if is_selected(code, rules))
+
+
 def get_error_description(error_code: str) -> str:
     """
-    Get a human-readable description for a PEP 257 error code.
+    Get a human-readable description for a PEP 257 (or signature check) error code.
     
     Args:
         error_code: The error code (e.g., "D401")
@@ -189,7 +303,7 @@ def get_error_description(error_code: str) -> str:
         "D210": "No whitespaces around docstring",
         "D211": "No blank lines allowed before docstring",
         "D212": "Multi-line docstring summary should start at the first line",
-        "D213": "Multi-line docstring summary should be on the first line",
+        "D213": "Multi-line docstring summary should start at the second line",
         "D214": "Section is over-indented",
         "D215": "Section underline is over-indented",
         "D216": "Section underline is not indented",
@@ -202,23 +316,29 @@ def get_error_description(error_code: str) -> str:
         "D302": "Use u\"\"\" if any unicode in a docstring",
         "D400": "First line should end with a period",
         "D401": "First line should be in imperative mood",
-        "D402": "First line should not be a function signature",
-        "D403": "First word of the first argument should be capitalized in the summary",
+        "D402": "First line should not be the function's signature",
+        "D403": "First word of the first line should be properly capitalized",
         "D404": "First word of the docstring should not be 'This'",
         "D405": "Section name should be properly capitalized",
-        "D406": "Section name should end with a colon",
-        "D407": "Missing exception after Raises section",
-        "D408": "Section (Raises) should have a colon after it",
-        "D409": "Section has blank lines (Raises)",
-        "D410": "Missing blank line after section (Raises)",
-        "D411": "Missing blank line before section (Raises)",
-        "D412": "No blank lines allowed between inline sections",
-        "D413": "Missing blank line after last section (Parameters)",
-        "D414": "Section has duplicate (Parameters)",
+        "D406": "Section name should end with a newline (NumPy)",
+        "D407": "Missing dashed underline after section (NumPy)",
+        "D408": "Section underline should be in the line following the section's name",
+        "D409": "Section underline should match the length of its name",
+        "D410": "Missing blank line after section",
+        "D411": "Missing blank line before section",
+        "D412": "No blank lines allowed between a section header and its content",
+        "D413": "Missing blank line after last section",
+        "D414": "Section has no content",
         "D415": "Short summary should end with period or semicolon",
-        "D416": "Name in section is not properly formatted",
+        "D416": "Section name should end with a colon (Google)",
         "D417": "Missing argument description in the docstring",
         "D418": "Function decorated with @property should not have a docstring",
+        "DAR102": "Docstring documents an argument that is not in the signature",
+        "DAR201": "Missing return value description",
+        "DAR202": "Return value documented, but the function does not return a value",
+        "DAR301": "Missing yields description",
+        "DAR302": "Yields documented, but the function is not a generator",
+        "DAR401": "Missing description of an exception raised by the function",
     }
     return error_descriptions.get(error_code, f"PEP 257 violation: {error_code}")
 
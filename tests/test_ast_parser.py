@@ -0,0 +1,35 @@
+from services.ast_parser import parse_functions, reparse_functions
+
+TRY_BLOCKS = '''\
+try:
+    def load():
+        return 1
+except ImportError:
+    def load():
+        return 2
+else:
+    def load():
+        return 3
+finally:
+    def load():
+        return 4
+'''
+
+
+def _summary(functions):
+    return [(func.qualname, func.line_number) for func in functions]
+
+
+def test_duplicate_names_in_try_blocks_are_numbered_in_source_order():
+    functions = parse_functions(TRY_BLOCKS)
+
+    assert _summary(functions) == [("load", 2), ("load#2", 5), ("load#3", 8), ("load#4", 11)]
+
+
+def test_reparse_matches_parse_for_try_blocks():
+    old_code = "import os\n\n" + TRY_BLOCKS
+    new_code = "import os\nimport sys\n\n" + TRY_BLOCKS
+
+    reparsed = reparse_functions(old_code, parse_functions(old_code), new_code)
+
+    assert _summary(reparsed) == _summary(parse_functions(new_code))
@@ -1,2 +1,125 @@
+import codecs
+import io
+import os
+import tokenize
+
+# Largest file accepted from an upload; checked before anything is decoded
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """Raised when a source file exceeds the configured size limit."""
+
+
 def read_uploaded_file(uploaded_file):
-    return uploaded_file.read().decode("utf-8")
+    """
+    Read an uploaded Python file into text.
+
+    Args:
+        uploaded_file: Streamlit UploadedFile (or any binary file object)
+
+    Returns:
+        The decoded source code
+
+    Raises:
+        FileTooLargeError: If the file is larger than MAX_UPLOAD_BYTES
+        SyntaxError: If the coding cookie names an unknown encoding
+        UnicodeDecodeError: If the file does not match its declared encoding
+    """
+    return read_source(uploaded_file, max_bytes=MAX_UPLOAD_BYTES)
+
+
+def detect_source_encoding(stream) -> str:
+    """
+    Detect a Python file's encoding from its BOM or PEP 263 coding cookie.
+
+    Only the first two lines are read; the stream is rewound afterwards.
+
+    Returns:
+        Codec name, e.g. "utf-8", "utf-8-sig" (BOM) or "iso-8859-1"
+
+    Raises:
+        SyntaxError: If the cookie is invalid or the first lines are not valid UTF-8
+    """
+    start = stream.tell()
+    try:
+        encoding, _ = tokenize.detect_encoding(stream.readline)
+    finally:
+        stream.seek(start)
+    return encoding
+
+
+def read_source(stream, max_bytes: int = None, encoding: str = None) -> str:
+    """
+    Decode a binary Python source stream without intermediate copies.
+
+    The size limit is enforced before decoding when the size is known
+    (uploads, seekable files) and while reading otherwise. In-memory uploads
+    are decoded straight from their buffer; other streams are decoded
+    incrementally in chunks. Line endings are kept as they are.
+
+    Args:
+        stream: Binary file object positioned at the start of the source
+        max_bytes: Optional maximum size in bytes
+        encoding: Codec to use instead of detecting it (see detect_source_encoding)
+
+    Returns:
+        The decoded source code
+
+    Raises:
+        FileTooLargeError: If the source is larger than `max_bytes`
+        SyntaxError: If the encoding cannot be detected
+        UnicodeDecodeError: If the bytes do not match the encoding
+    """
+    size = _remaining_size(stream)
+    if max_bytes is not None and size is not None and size > max_bytes:
+        raise FileTooLargeError(f"File is {size:,} bytes; the limit is {max_bytes:,} bytes")
+
+    if encoding is None:
+        encoding = detect_source_encoding(stream)
+
+    if hasattr(stream, "getbuffer"):
+        # BytesIO (and Streamlit uploads): decode the existing buffer in place
+        with stream.getbuffer() as view:
+            return str(view[stream.tell():], encoding)
+
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pieces = []
+    total = 0
+    while True:
+        chunk = stream.read(_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            raise FileTooLargeError(f"File is larger than the limit of {max_bytes:,} bytes")
+        pieces.append(decoder.decode(chunk))
+    pieces.append(decoder.decode(b"", final=True))
+    return "".join(pieces)
+
+
+def decode_source(data) -> str:
+    """
+    Decode Python source bytes, honouring a BOM or PEP 263 coding cookie.
+
+    Args:
+        data: bytes, bytearray or memoryview holding the source
+
+    Returns:
+        The decoded source code
+    """
+    return read_source(io.BytesIO(data))
+
+
+def _remaining_size(stream):
+    """Return the number of bytes left in `stream`, or None if it cannot be known cheaply."""
+    if getattr(stream, "size", None) is not None:
+        return stream.size - stream.tell()
+    if hasattr(stream, "seekable") and stream.seekable():
+        position = stream.tell()
+        end = stream.seek(0, io.SEEK_END)
+        stream.seek(position)
+        return end - position
+    return None